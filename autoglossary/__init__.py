@@ -1,2 +1,5 @@
 from autoglossary.glossary import Glossary
 from autoglossary.link_inserter import GlossaryLinkInserter
+from autoglossary.matcher import TermMatcher
+from autoglossary.surface_index import SurfaceIndex
+from autoglossary.artifact import CompiledGlossary, compile_glossary, load_glossary
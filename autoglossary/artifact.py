@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+from autoglossary.glossary import Glossary
+from autoglossary.matcher import TermMatcher
+from autoglossary.surface_index import SurfaceIndex
+from autoglossary.tokenizer import Tokenizer
+
+
+# Bump whenever term expansion or the matcher layout changes
+ARTIFACT_VERSION = 3
+
+
+class CompiledGlossary:
+    def __init__(
+        self, matcher: TermMatcher, surface_index: Optional[SurfaceIndex] = None, tokenizer: Optional[Tokenizer] = None,
+    ) -> None:
+        self.matcher = matcher
+        self.surface_index = surface_index
+        self.tokenizer = tokenizer
+
+    def build_surface_index(self) -> SurfaceIndex:
+        # Generating the lexemes of every term word is costly, so only runs matching
+        # by surface forms pay for it
+        if self.surface_index is None:
+            self.surface_index = SurfaceIndex.from_matcher(self.matcher, self.tokenizer or Tokenizer())
+        return self.surface_index
+
+    @property
+    def dictionary(self) -> Dict[Tuple[str, ...], int]:
+        return dict(self.matcher.terms())
+
+    @classmethod
+    def from_glossary(cls, glossary: Glossary) -> "CompiledGlossary":
+        return cls(glossary.matcher, tokenizer=glossary.tokenizer)
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_artifact(compiled: CompiledGlossary, artifact_path: str, source_hash: str) -> None:
+    artifact = {
+        "version": ARTIFACT_VERSION,
+        "source_hash": source_hash,
+        # Nodes shared by term variations are stored once
+        "nodes": compiled.matcher.to_nodes(),
+    }
+    if compiled.surface_index is not None:
+        artifact["surface_forms"] = compiled.surface_index.forms
+        artifact["surface_stems"] = sorted(compiled.surface_index.stems)
+    tmp_path = f"{artifact_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(artifact, file, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, artifact_path)
+
+
+def load_artifact(
+    artifact_path: str, source_hash: Optional[str] = None, tokenizer: Optional[Tokenizer] = None,
+) -> Optional[CompiledGlossary]:
+    if not os.path.exists(artifact_path):
+        return None
+    with open(artifact_path, 'r', encoding='utf-8') as file:
+        artifact = json.load(file)
+    if artifact.get("version") != ARTIFACT_VERSION:
+        return None
+    if source_hash is not None and artifact.get("source_hash") != source_hash:
+        return None
+    surface_index = None
+    if "surface_forms" in artifact:
+        surface_index = SurfaceIndex(artifact["surface_forms"], artifact["surface_stems"])
+    return CompiledGlossary(TermMatcher.from_nodes(artifact["nodes"]), surface_index, tokenizer)
+
+
+def compile_glossary(
+    glossary_path: str, artifact_path: str, tokenizer: Optional[Tokenizer] = None, surface_forms: bool = False,
+) -> CompiledGlossary:
+    with open(glossary_path, 'r', encoding='utf-8') as file:
+        raw_glossary = json.load(file)
+    glossary = Glossary(raw_glossary, tokenizer or Tokenizer())
+    compiled = CompiledGlossary.from_glossary(glossary)
+    if surface_forms:
+        compiled.build_surface_index()
+    save_artifact(compiled, artifact_path, file_hash(glossary_path))
+    return compiled
+
+
+def load_glossary(
+    glossary_path: str, artifact_path: str, tokenizer: Optional[Tokenizer] = None, surface_forms: bool = False,
+) -> CompiledGlossary:
+    # An artifact saved without surface forms gets them added once a run asks for them
+    source_hash = file_hash(glossary_path)
+    compiled = load_artifact(artifact_path, source_hash, tokenizer)
+    if compiled is None:
+        compiled = compile_glossary(glossary_path, artifact_path, tokenizer, surface_forms)
+    elif surface_forms and compiled.surface_index is None:
+        compiled.build_surface_index()
+        save_artifact(compiled, artifact_path, source_hash)
+    return compiled
@@ -1,8 +1,9 @@
 import re
 
 from collections import defaultdict
-from typing import List
+from typing import Dict, List, Tuple
 
+from autoglossary.matcher import TermMatcher, compile_term
 from autoglossary.tokenizer import Tokenizer
 
 
@@ -13,25 +14,25 @@ class Term:
         assert self.id is not None or self.name is not None, "В исходном json глоссарии отсутствуют поля id и/или title"
         
         self.tokenizer = tokenizer
-        self.term_dict = self._build_term_dict(self.name, self.id)
-    
-    def _build_term_dict(self, name: str, id: int) -> dict:
+        self.graph = self._build_graph(self.name, self.id)
+
+    @property
+    def term_dict(self) -> Dict[Tuple[str, ...], int]:
+        return dict(TermMatcher.from_trie(self.graph).terms())
+
+    def _build_graph(self, name: str, id: int) -> dict:
         lemm_name = self.tokenizer.normalize_text(name)
         mask, wordlist = self._prepare_name(lemm_name)
 
         rank = sum(mask)
         if rank == 0:
-            prepared_terms = self._get_without_variations(wordlist)
+            groups = [self._get_without_variations(wordlist)]
         elif rank == 1 and mask[-1] == 1:
-            prepared_terms = self._get_one_alternative(wordlist)
+            groups = [self._get_one_alternative(wordlist)]
         else:
-            prepared_terms = self._get_variations(mask, wordlist)
+            groups = self._get_variations(mask, wordlist)
 
-        term_dict = {}
-        for key in prepared_terms:
-            term_dict[tuple(key)] = id
-
-        return term_dict
+        return compile_term(groups, id)
 
     def _prepare_name(self, name):
         variations_mask = []
@@ -104,25 +105,14 @@ class Term:
             i += 1
         return variations_fold
     
-    def _combine_variations(self, variations_fold: dict) -> List[List[str]]:
-        variations = []
-        def recursive_combinations(variations_fold, i, alternative):
-            if i not in variations_fold.keys():
-                variations.append(alternative)
-            else:
-                for word in variations_fold[i]:
-                    if i == 0:
-                        recursive_combinations(variations_fold, i+1, alternative + word)
-                    else:
-                        recursive_combinations(variations_fold, i+1, alternative + " " + word)
-        
-        recursive_combinations(variations_fold, 0, "")
-        return variations
-    
     def _get_variations(self, mask, wordslist):
+        # One group of alternatives per position, in order up to the first missing one
         variations_mask, words = self._prepare_alternatives_mask(mask, wordslist)
         variations_fold = self._prepare_variations_fold(variations_mask, words)
-        return [tuple(variation.split()) for variation in self._combine_variations(variations_fold)]
+        groups = []
+        while len(groups) in variations_fold:
+            groups.append([tuple(variation.split()) for variation in variations_fold[len(groups)]])
+        return groups
 
     def _get_one_alternative(self, words):
         return [tuple(words[:-1])] + [tuple(words[-1].split())]
@@ -135,16 +125,15 @@ class Glossary:
     def __init__(self, raw_glossary: dict, tokenizer: Tokenizer) -> None:
         self.tokenizer = tokenizer
         self.terms = self._parse_terms(raw_glossary)
-        self.dictionary = self._collect_glossary_dict()
+        # Later terms win over earlier ones with the same word sequence
+        self.matcher = TermMatcher.from_graphs(term.graph for term in self.terms)
+
+    @property
+    def dictionary(self) -> Dict[Tuple[str, ...], int]:
+        return dict(self.matcher.terms())
 
     def _parse_terms(self, raw_glossary: dict) -> List[Term]:
         terms = []
         for item in raw_glossary:
             terms.append(Term(item, self.tokenizer))
         return terms
-    
-    def _collect_glossary_dict(self):
-        glossary_dict = {}
-        for term in self.terms:
-            glossary_dict.update(term.term_dict)
-        return glossary_dict
@@ -1,63 +1,195 @@
-import re
-from typing import List
+from bisect import bisect_left
+from itertools import accumulate
+from typing import List, Optional, TextIO, Tuple, Union
 
+from autoglossary.matcher import TermMatcher
+from autoglossary.surface_index import SurfaceIndex
 from autoglossary.tokenizer import Tokenizer
+from link_common.edits import LinkEdit, apply_edits
+from link_common.metrics import metrics
+from link_common.parallel import map_pieces, split_pieces
+from link_common.regions import RegionIndex
+
+
+# Stands for markup among the lemmas: a word, so tags still separate the words around them
+# as their names did, that no term has, as underscores are stripped from term names
+MARKUP_LEMMA = "_"
 
 
 class GlossaryLink:
+    # Spans are rendered only for the matches emitted
+    __slots__ = ("start", "end", "glossary_item_id")
+
     def __init__(self, start, end, glossary_item_id) -> None:
         self.start = start
         self.end = end
-        self.span_info = f"""data-glossary-item-id="{glossary_item_id}">"""
-        self.open_span = f"""<span class="abbr" {self.span_info}"""
-        self.close_span = """</span>"""
+        self.glossary_item_id = glossary_item_id
+
+    @property
+    def span_info(self) -> str:
+        return f"""data-glossary-item-id="{self.glossary_item_id}">"""
+
+    @property
+    def open_span(self) -> str:
+        return f"""<span class="abbr" {self.span_info}"""
+
+    @property
+    def close_span(self) -> str:
+        return """</span>"""
 
 
 class GlossaryLinkInserter:
-    def __init__(self, tokenizer: Tokenizer) -> None:
+    def __init__(
+        self, tokenizer: Tokenizer, surface_index: Optional[SurfaceIndex] = None, markup_aware: bool = True,
+    ) -> None:
         self.tokenizer = tokenizer
+        self.surface_index = surface_index
+        # Tags, comments, styles and scripts are kept whole and never lemmatized or matched
+        self.markup_aware = markup_aware
+
+    def html_insertion(self, html: str, glossary: Union[dict, TermMatcher]) -> str:
+        edits = self.edits(html, glossary)
+        with metrics.timer("glossary_links.assemble"):
+            return apply_edits(html, edits)
 
-    def html_insertion(self, html: str, glossary: dict) -> str:
+    def edits(
+        self, html: str, glossary: Union[dict, TermMatcher], regions: Optional[RegionIndex] = None,
+    ) -> List[LinkEdit]:
+        # Spans sorted by start, for consumers that do not need the linked html
         link_list = self._find_glossary(html, glossary)
-        for link in link_list[::-1]:
-            if not self._check_existing_span(self.tokens, link):
-                self.tokens.insert(link.end, link.close_span)
-                self.tokens.insert(link.start, link.open_span)
-        return "".join(self.tokens)
-    
-    def _check_existing_span(self, tokens: List[str], link: GlossaryLink) -> bool:
-        left_len = len(self.tokenizer.tokenize(link.span_info))
-        right_len = len(self.tokenizer.tokenize(link.close_span))
-        if ''.join(tokens[link.start - left_len:link.start])[-len(link.span_info):] == link.span_info \
-            and ''.join(tokens[link.end:link.end + right_len])[:len(link.close_span)] == link.close_span:
-            return True
-        return False
+        return self._collect_edits(self.tokens, link_list, regions or RegionIndex(html))
+
+    def stream_insertion(
+        self, reader: TextIO, writer: TextIO, glossary: Union[dict, TermMatcher], chunk_size: int = 1 << 20,
+    ) -> None:
+        if not isinstance(glossary, TermMatcher):
+            glossary = TermMatcher(glossary)
+        # A match starting at a word is only decided once the longest possible term after it is read
+        undecided_words = glossary.max_length
+
+        regions = RegionIndex()
+        written_total = 0
+        pending = ""
+        eof = False
+        while not eof:
+            chunk = reader.read(chunk_size)
+            eof = not chunk
+            pending += chunk
+            regions.feed(chunk)
+
+            tokens = self._tokenize(pending)
+            if not eof:
+                # The last token may continue in the next chunk
+                tokens.pop()
+            lemmatized_tokens = self._lemmatize(tokens)
+            matches, resume = glossary.find_decided(
+                lemmatized_tokens, undecided_words=0 if eof else undecided_words,
+            )
+
+            link_list = [
+                GlossaryLink(start=start, end=end, glossary_item_id=glossary_item_id)
+                for start, end, glossary_item_id in matches
+            ]
+            edits = self._collect_edits(tokens, link_list, regions, written_total)
+            written = sum(map(len, tokens[:resume]))
+            writer.write(apply_edits(pending[:written], edits))
+
+            written_total += written
+            regions.forget(written_total)
+            pending = pending[written:]
+
+    def parallel_insertion(
+        self, html: str, glossary: Union[dict, TermMatcher], workers: Optional[int] = None, piece_size: int = 1 << 20,
+    ) -> str:
+        # Markup is never part of a term, so pieces of tokens ending with a tag are
+        # lemmatized and matched apart with the same matches as the whole document
+        if not self.markup_aware:
+            raise ValueError("pieces are cut at tags, which only separate terms in markup-aware mode")
+        if not isinstance(glossary, TermMatcher):
+            glossary = TermMatcher(glossary)
+
+        self.tokens = self._tokenize(html)
+        cuts = [i + 1 for i, token in enumerate(self.tokens) if _is_markup(token)]
+        tokens_per_piece = max(1, piece_size * len(self.tokens) // max(len(html), 1))
+        pieces = split_pieces(
+            len(self.tokens),
+            tokens_per_piece,
+            lambda position: cuts[bisect_left(cuts, position)] if cuts and position <= cuts[-1] else len(self.tokens),
+        )
+        found = map_pieces(_match_piece, (self, glossary, self.tokens), pieces, workers)
+        link_list = [
+            GlossaryLink(start=start, end=end, glossary_item_id=glossary_item_id)
+            for matches in found
+            for start, end, glossary_item_id in matches
+        ]
+        edits = self._collect_edits(self.tokens, link_list, RegionIndex(html))
+        with metrics.timer("glossary_links.assemble"):
+            return apply_edits(html, edits)
+
+    def _collect_edits(
+        self, tokens: List[str], link_list: List[GlossaryLink], regions: RegionIndex, offset: int = 0,
+    ) -> List[LinkEdit]:
+        # regions index the existing links and spans of the whole text, the tokens start at offset in it
+        offsets = list(accumulate(map(len, tokens), initial=0))
+        edits = []
+        existing = 0
+        for link in link_list:
+            start, end = offsets[link.start], offsets[link.end]
+            if regions.spans.inside(start + offset, end + offset):
+                existing += 1
+            elif not regions.spans.crosses(start + offset, end + offset) \
+                    and not regions.links.crosses(start + offset, end + offset):
+                edits.append(LinkEdit(start, end, link.open_span, link.close_span, link.glossary_item_id))
+
+        metrics.count("glossary_links.inserted", len(edits))
+        metrics.count("glossary_links.existing", existing)
+        metrics.count("glossary_links.overlapping", len(link_list) - len(edits) - existing)
+        return edits
     
-    def _find_glossary(self, html: str, glossary: dict):
-        self.tokens = self.tokenizer.tokenize(html)
-        lemmatized_tokens = self.tokenizer.lemmatize(self.tokens)
+    def _tokenize(self, html: str) -> List[str]:
+        if self.markup_aware:
+            return self.tokenizer.tokenize_markup(html)
+        return self.tokenizer.tokenize(html)
+
+    def _lemmatize(self, tokens: List[str]) -> List[str]:
+        if self.surface_index is not None:
+            lemmatized_tokens = self.surface_index.lemmatize(tokens, self.tokenizer)
+        else:
+            lemmatized_tokens = self.tokenizer.lemmatize(tokens)
+        if self.markup_aware:
+            lemmatized_tokens = [
+                MARKUP_LEMMA if _is_markup(token) else lemma
+                for token, lemma in zip(tokens, lemmatized_tokens)
+            ]
+        return lemmatized_tokens
+
+    def _find_glossary(self, html: str, glossary: Union[dict, TermMatcher]) -> List[GlossaryLink]:
+        self.tokens = self._tokenize(html)
+        lemmatized_tokens = self._lemmatize(self.tokens)
+
+        if not isinstance(glossary, TermMatcher):
+            glossary = TermMatcher(glossary)
+
+        with metrics.timer("glossary_links.match"):
+            matches = glossary.find(lemmatized_tokens)
 
         link_list = []
-        i = 0
-        while i < len(lemmatized_tokens):
-            start, end = 0, 0
-            if re.match(r"[\w]+", lemmatized_tokens[i]):
-                for termin in glossary:
-                    for j, termin_part in enumerate(termin):
-                        while not re.match(r"[\w]+", lemmatized_tokens[i]):
-                            i += 1
-                        
-                        if lemmatized_tokens[i] == termin_part:
-                            if start == 0:
-                                start = i
-                            i += 1
-                        else:
-                            break
-                        if j == len(termin) - 1:
-                            end = i
-                            i -= 1
-                            link_list.append(
-                                GlossaryLink(start=start, end=end, glossary_item_id=glossary[termin])
-                            )
-            i += 1
+        for start, end, glossary_item_id in matches:
+            link_list.append(
+                GlossaryLink(start=start, end=end, glossary_item_id=glossary_item_id)
+            )
         return link_list
+
+
+def _is_markup(token: str) -> bool:
+    return token[0] == "<" and token[-1] == ">"
+
+
+def _match_piece(
+    shared: Tuple[GlossaryLinkInserter, TermMatcher, List[str]], start: int, end: int,
+) -> List[Tuple[int, int, int]]:
+    inserter, glossary, tokens = shared
+    lemmatized_tokens = inserter._lemmatize(tokens[start:end])
+    with metrics.timer("glossary_links.match"):
+        matches = glossary.find(lemmatized_tokens)
+    return [(match_start + start, match_end + start, term_id) for match_start, match_end, term_id in matches]
@@ -0,0 +1,186 @@
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from autoglossary.tokenizer import WORD_REGEX
+
+
+# Lemmas of word tokens are never empty, so the empty key can mark the end of a term
+TERM_END = ""
+
+
+def graph_nodes(graph: dict) -> List[dict]:
+    # Nodes shared by several paths are listed once
+    seen = {id(graph)}
+    nodes = [graph]
+    i = 0
+    while i < len(nodes):
+        for key, child in nodes[i].items():
+            if key != TERM_END and id(child) not in seen:
+                seen.add(id(child))
+                nodes.append(child)
+        i += 1
+    return nodes
+
+
+def compile_term(groups: Sequence[Sequence[Tuple[str, ...]]], term_id: int) -> dict:
+    # A term is a sequence of groups of alternative word sequences. All alternatives
+    # of a group lead to one shared node, so their combinations are never enumerated.
+    tail = {TERM_END: term_id}
+    for alternatives in reversed(groups):
+        builder = GraphBuilder()
+        for words in alternatives:
+            node = tail
+            for word in reversed(words):
+                node = {word: node}
+            builder.add(node)
+        tail = builder.root
+    # The empty sequence is not a term
+    tail.pop(TERM_END, None)
+    return tail
+
+
+class GraphBuilder:
+    # Merges term graphs into one without changing them: a node reached from
+    # several places is copied before anything is added below it
+    def __init__(self) -> None:
+        self.root = {}
+        # Nodes made here with a single parent, safe to change in place
+        self._private = {id(self.root)}
+
+    def add(self, graph: dict) -> None:
+        # On a sequence present in both, the id of the added graph wins
+        self._merge_into(self.root, graph, {})
+
+    def _merge_into(self, node: dict, graph: dict, merged: dict) -> None:
+        for key, child in graph.items():
+            current = node.get(key)
+            if key == TERM_END or current is None:
+                node[key] = child
+            elif current is not child:
+                node[key] = self._merge(current, child, merged)
+
+    def _merge(self, node: dict, graph: dict, merged: dict) -> dict:
+        pair = (id(node), id(graph))
+        if pair in merged:
+            result = merged[pair]
+            # Now reached from two places
+            self._private.discard(id(result))
+            return result
+        if id(node) in self._private:
+            result = node
+        else:
+            result = dict(node)
+            self._private.add(id(result))
+        merged[pair] = result
+        self._merge_into(result, graph, merged)
+        return result
+
+
+class TermMatcher:
+    def __init__(self, glossary: Dict[Tuple[str, ...], int]) -> None:
+        self.trie = self._build_trie(glossary)
+        self.max_length = self._trie_depth(self.trie)
+
+    @classmethod
+    def from_trie(cls, trie: dict) -> "TermMatcher":
+        matcher = cls.__new__(cls)
+        matcher.trie = trie
+        matcher.max_length = matcher._trie_depth(trie)
+        return matcher
+
+    @classmethod
+    def from_graphs(cls, graphs: Iterable[dict]) -> "TermMatcher":
+        builder = GraphBuilder()
+        for graph in graphs:
+            builder.add(graph)
+        return cls.from_trie(builder.root)
+
+    @classmethod
+    def from_nodes(cls, nodes: List[Dict[str, int]]) -> "TermMatcher":
+        # Children are given by their index in the list, the root comes first
+        graph = [{} for _ in nodes]
+        for node, links in zip(graph, nodes):
+            for key, value in links.items():
+                node[key] = value if key == TERM_END else graph[value]
+        return cls.from_trie(graph[0])
+
+    def to_nodes(self) -> List[Dict[str, int]]:
+        nodes = graph_nodes(self.trie)
+        index = {id(node): i for i, node in enumerate(nodes)}
+        return [
+            {key: child if key == TERM_END else index[id(child)] for key, child in node.items()}
+            for node in nodes
+        ]
+
+    def terms(self) -> Iterator[Tuple[Tuple[str, ...], int]]:
+        # Every term as a word sequence, as many as the combinations of its variations
+        stack = [(self.trie, ())]
+        while stack:
+            node, words = stack.pop()
+            for key, child in node.items():
+                if key == TERM_END:
+                    yield words, child
+                else:
+                    stack.append((child, words + (key,)))
+
+    def find(self, lemmatized_tokens: List[str], start: int = 0) -> List[Tuple[int, int, int]]:
+        matches, _ = self.find_decided(lemmatized_tokens, start)
+        return matches
+
+    def find_decided(
+        self, lemmatized_tokens: List[str], start: int = 0, undecided_words: int = 0,
+    ) -> Tuple[List[Tuple[int, int, int]], int]:
+        # Matches may not start at the last undecided_words words: more tokens can
+        # still follow them. Returns the matches and the token index to resume from.
+        # Every word is tried as a term start, unlike the per-term scan this replaced,
+        # which skipped words after a partial match and so linked fewer terms.
+        word_positions = [
+            i for i in range(start, len(lemmatized_tokens)) if WORD_REGEX.match(lemmatized_tokens[i])
+        ]
+
+        matches = []
+        k = 0
+        while k < len(word_positions) - undecided_words:
+            node = self.trie
+            longest = None
+            m = k
+            while m < len(word_positions):
+                node = node.get(lemmatized_tokens[word_positions[m]])
+                if node is None:
+                    break
+                m += 1
+                if TERM_END in node:
+                    longest = (m, node[TERM_END])
+
+            if longest is None:
+                k += 1
+                continue
+
+            m, term_id = longest
+            matches.append((word_positions[k], word_positions[m - 1] + 1, term_id))
+            k = m
+
+        resume = word_positions[k] if k < len(word_positions) else len(lemmatized_tokens)
+        return matches, resume
+
+    def _build_trie(self, glossary: Dict[Tuple[str, ...], int]) -> dict:
+        trie = {}
+        for termin, term_id in glossary.items():
+            if len(termin) == 0 or TERM_END in termin:
+                continue
+            node = trie
+            for termin_part in termin:
+                node = node.setdefault(termin_part, {})
+            node[TERM_END] = term_id
+        return trie
+
+    def _trie_depth(self, trie: dict) -> int:
+        depth = 0
+        level = [trie]
+        while level:
+            # Shared nodes are walked once per level
+            level = list({
+                id(child): child for node in level for key, child in node.items() if key != TERM_END
+            }.values())
+            if level:
+                depth += 1
+        return depth
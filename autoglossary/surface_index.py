@@ -0,0 +1,83 @@
+from os.path import commonprefix
+from typing import Dict, Iterable, List, Set
+
+from autoglossary.matcher import TERM_END, TermMatcher, graph_nodes
+from autoglossary.tokenizer import WORD_REGEX, Tokenizer
+from link_common.metrics import metrics
+
+
+# Shorter stems would send most of the page back to pymorphy2
+MIN_STEM_LENGTH = 3
+
+
+def _fold(word: str) -> str:
+    return word.lower().replace("ё", "е")
+
+
+class SurfaceIndex:
+    def __init__(self, forms: Dict[str, str], stems: Iterable[str]) -> None:
+        # Lowercased surface form -> the lemma pymorphy2 gives for it
+        self.forms = forms
+        # Lexeme stems of the term words: unknown tokens starting with one of them
+        # may still be an inflection pymorphy2 predicts, so they are lemmatized
+        self.stems: Set[str] = set(stems)
+        self.stem_lengths = sorted({len(stem) for stem in self.stems})
+
+    @classmethod
+    def from_matcher(cls, matcher: TermMatcher, tokenizer: Tokenizer) -> "SurfaceIndex":
+        surfaces = set()
+        stems = set()
+        for lemma in cls._term_words(matcher.trie):
+            lexeme = cls._lexeme(lemma, tokenizer)
+            surfaces.update(lexeme)
+            surfaces.update(map(_fold, lexeme))
+            stem = commonprefix([_fold(form) for form in lexeme])
+            if len(stem) >= MIN_STEM_LENGTH:
+                stems.add(stem)
+
+        surfaces = sorted(surfaces)
+        forms = dict(zip(surfaces, tokenizer.lemmatize(surfaces)))
+        return cls(forms, stems)
+
+    def lemmatize(self, tokens: List[str], tokenizer: Tokenizer) -> List[str]:
+        # Words that cannot be a form of any term word are left as they are:
+        # they never equal a lemma in the trie, so matching is unaffected
+        lemmas = {}
+        leftovers = []
+        with metrics.timer("surface_index.lookup"):
+            for word in set(tokens):
+                if not WORD_REGEX.match(word):
+                    continue
+                lowered = word.lower()
+                lemma = self.forms.get(lowered)
+                if lemma is not None:
+                    lemmas[word] = lemma
+                elif self._has_stem(_fold(lowered)):
+                    leftovers.append(word)
+
+        if leftovers:
+            lemmas.update(zip(leftovers, tokenizer.lemmatize(leftovers)))
+        metrics.count("surface_index.hits", len(lemmas) - len(leftovers))
+        metrics.count("surface_index.fallbacks", len(leftovers))
+        return [lemmas.get(word, word) for word in tokens]
+
+    def _has_stem(self, word: str) -> bool:
+        for length in self.stem_lengths:
+            if length > len(word):
+                break
+            if word[:length] in self.stems:
+                return True
+        return False
+
+    @staticmethod
+    def _term_words(trie: dict) -> Set[str]:
+        return {key for node in graph_nodes(trie) for key in node if key != TERM_END}
+
+    @staticmethod
+    def _lexeme(lemma: str, tokenizer: Tokenizer) -> List[str]:
+        parses = tokenizer.analyzer.parse(lemma)
+        own_parses = [parse for parse in parses if parse.normal_form == lemma] or parses
+        forms = {lemma}
+        for parse in own_parses:
+            forms.update(form.word for form in parse.lexeme)
+        return sorted(forms)
@@ -1,26 +1,71 @@
 import re
-import pymorphy2
-
+from functools import lru_cache
 from typing import List
 
+from link_common.metrics import metrics
+from link_common.utils import LazyRegex
+
+
+WORD_REGEX = LazyRegex(r"[\w]+")
+TOKEN_REGEX = LazyRegex(r"[\w']+|[ \W]+")
+# Comments, style and script blocks and tags are single tokens; one left unfinished
+# at the end of the text runs to its end, so a stream can hold it back as its last token
+MARKUP_TOKEN_REGEX = LazyRegex(
+    r"<!--.*?(?:-->|$)|<(?:style|script)\b.*?(?:</(?:style|script)\s*>|$)|<[^<>]*(?:>|$)|<|[\w']+|[^\w'<]+",
+    re.S | re.I,
+)
+
+
+@lru_cache(maxsize=None)
+def get_morph_analyzer():
+    # pymorphy2 loads its dictionaries on construction, so one analyzer
+    # is created on first use and shared by every Tokenizer in the process
+    import pymorphy2
+    return pymorphy2.MorphAnalyzer()
+
 
 class Tokenizer:
-    def __init__(self) -> None:
-        self.analyzer = pymorphy2.MorphAnalyzer()
+    def __init__(self, cache_size: int = 200_000) -> None:
+        self._normal_form = lru_cache(maxsize=cache_size)(self._analyze_normal_form)
+
+    @property
+    def analyzer(self):
+        return get_morph_analyzer()
 
     def tokenize(self, text: str) -> List[str]:
-        return re.findall(r"[\w']+|[ \W]+", text)
+        with metrics.timer("tokenizer.tokenize"):
+            return TOKEN_REGEX.findall(text)
+
+    def tokenize_markup(self, text: str) -> List[str]:
+        with metrics.timer("tokenizer.tokenize"):
+            return MARKUP_TOKEN_REGEX.findall(text)
 
     def lemmatize(self, tokens: List[str]) -> List[str]:
-        lemmatized = []
-        for word in tokens:
-            if re.match(r"[\w]+", word):
-                norm_word = self.analyzer.normal_forms(word)[0]
-                lemmatized.append(norm_word)
-            else:
-                lemmatized.append(word)
+        cache_before = self._normal_form.cache_info() if metrics.enabled else None
+        with metrics.timer("tokenizer.lemmatize"):
+            lemmas = {}
+            for word in set(tokens):
+                if WORD_REGEX.match(word):
+                    lemmas[word] = self._normal_form(word)
+            lemmatized = [lemmas.get(word, word) for word in tokens]
+
+        if cache_before is not None:
+            cache_after = self._normal_form.cache_info()
+            metrics.count("tokenizer.tokens", len(tokens))
+            metrics.count("tokenizer.unique_words", len(lemmas))
+            metrics.count("tokenizer.lemma_cache_hits", cache_after.hits - cache_before.hits)
+            metrics.count("tokenizer.lemma_cache_misses", cache_after.misses - cache_before.misses)
         return lemmatized
 
     def normalize_text(self, text: str) -> str:
         tokens = self.tokenize(text)
         return "".join(self.lemmatize(tokens))
+
+    def cache_info(self):
+        return self._normal_form.cache_info()
+
+    def cache_clear(self) -> None:
+        self._normal_form.cache_clear()
+
+    def _analyze_normal_form(self, word: str) -> str:
+        return self.analyzer.normal_forms(word)[0]
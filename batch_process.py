@@ -0,0 +1,369 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from autoglossary import Glossary, GlossaryLinkInserter, SurfaceIndex, load_glossary
+from autoglossary.artifact import file_hash
+from autoglossary.matcher import TermMatcher
+from autoglossary.tokenizer import Tokenizer, get_morph_analyzer
+from document_layout import LayoutCollector
+from document_linker import DocumentLinkInserter, DocumentDatabase, SqliteDocumentDatabase, UnresolvedIndex
+from document_linker.document_database import Reference
+from link_common.metrics import metrics
+from result_cache import ResultCache, content_hash
+from utils import load_html, load_json, save_html
+
+
+class BatchState(NamedTuple):
+    collector: LayoutCollector
+    document_linker: DocumentLinkInserter
+    document_database: Union[DocumentDatabase, SqliteDocumentDatabase, None]
+    glossary_inserter: Optional[GlossaryLinkInserter]
+    glossary_matcher: Optional[TermMatcher]
+    cache: Optional[ResultCache] = None
+    fingerprints: Dict[str, str] = {}
+
+
+class FileResult(NamedTuple):
+    path: str
+    timings: Dict[str, float]
+    error: Optional[str]
+    metrics: Optional[dict] = None
+    unresolved: Optional[List[Reference]] = None
+
+
+_state: Optional[BatchState] = None
+
+# Runs every stage once in the parent, so that lazily built state exists before forking
+WARM_UP_HTML = (
+    '<html><body><p>от 01.01.2020 № 1-П, пункт 1.1</p><p><i>О порядке</i></p>'
+    '<p>Кредитной организации</p><p>И.И. Иванов</p></body></html>'
+)
+
+
+def missing_registry_message(documents_db_path: str) -> str:
+    return f"registry {documents_db_path} does not exist, pass --documents to build it"
+
+
+def build_state(
+    documents_path: Optional[str],
+    glossary_path: Optional[str],
+    glossary_artifact_path: Optional[str] = None,
+    documents_db_path: Optional[str] = None,
+    surface_forms: bool = False,
+    cache_path: Optional[str] = None,
+    cache_size: int = 1 << 30,
+    cache_paragraphs: bool = False,
+) -> BatchState:
+    document_database = None
+    if documents_db_path is not None:
+        if documents_path is not None:
+            # The registry file is rebuilt whenever the json it was built from changes
+            source_hash = file_hash(documents_path)
+            if not os.path.exists(documents_db_path) \
+                    or SqliteDocumentDatabase(documents_db_path).source_hash != source_hash:
+                SqliteDocumentDatabase.build(load_json(documents_path), documents_db_path, source_hash)
+        elif not os.path.exists(documents_db_path):
+            raise ValueError(missing_registry_message(documents_db_path))
+        document_database = SqliteDocumentDatabase(documents_db_path)
+    elif documents_path is not None:
+        document_database = DocumentDatabase(documents_json=load_json(documents_path))
+
+    glossary_inserter = None
+    glossary_matcher = None
+    if glossary_path is not None:
+        tokenizer = Tokenizer()
+        surface_index = None
+        if glossary_artifact_path is not None:
+            glossary = load_glossary(glossary_path, glossary_artifact_path, tokenizer, surface_forms)
+            if surface_forms:
+                surface_index = glossary.build_surface_index()
+        else:
+            glossary = Glossary(load_json(glossary_path), tokenizer)
+            if surface_forms:
+                surface_index = SurfaceIndex.from_matcher(glossary.matcher, tokenizer)
+        glossary_inserter = GlossaryLinkInserter(tokenizer, surface_index)
+        glossary_matcher = glossary.matcher
+
+    collector = LayoutCollector()
+    document_linker = DocumentLinkInserter()
+
+    cache = None
+    fingerprints = {}
+    if cache_path is not None:
+        cache = ResultCache(cache_path, max_size=cache_size, paragraphs=cache_paragraphs)
+        patterns = content_hash(document_linker.pattenr_handler.document_patterns)
+        documents_source = documents_db_path if documents_db_path is not None else documents_path
+        documents = file_hash(documents_source) if documents_source is not None else ""
+        fingerprints = {
+            "layout": patterns,
+            "document_links": content_hash(patterns, documents),
+            "glossary_links": file_hash(glossary_path) if glossary_path is not None else "",
+        }
+
+    return BatchState(
+        collector=collector,
+        document_linker=document_linker,
+        document_database=document_database,
+        glossary_inserter=glossary_inserter,
+        glossary_matcher=glossary_matcher,
+        cache=cache,
+        fingerprints=fingerprints,
+    )
+
+
+def preload_state(state: BatchState) -> None:
+    # pymorphy2 dictionaries and compiled regexes are built here rather than in every
+    # worker, and the garbage collector leaves the objects built so far alone, so that
+    # forked workers keep sharing their pages instead of copying them
+    state.collector.collect_data(WARM_UP_HTML)
+    if state.document_database is not None:
+        state.document_linker.html_insertion(html=WARM_UP_HTML, document_database=state.document_database)
+    if state.glossary_inserter is not None:
+        get_morph_analyzer()
+        state.glossary_inserter.html_insertion(html=WARM_UP_HTML, glossary=state.glossary_matcher)
+    gc.freeze()
+
+
+def _init_worker(options: dict) -> None:
+    # Forked workers inherit the state built by the parent
+    global _state
+    if _state is None:
+        _state = build_state(**options)
+
+
+def process_file(task: Tuple[str, str]) -> FileResult:
+    path, output_base = task
+    timings = {}
+    if metrics.enabled:
+        metrics.reset()
+    try:
+        start = time.perf_counter()
+        html = load_html(path)
+        timings["load"] = time.perf_counter() - start
+
+        cache = _state.cache
+        fingerprints = _state.fingerprints
+
+        start = time.perf_counter()
+        if cache is not None:
+            document_layout = cache.collect_data(_state.collector, html, fingerprints["layout"])
+        else:
+            document_layout = _state.collector.collect_data(html)
+        timings["layout"] = time.perf_counter() - start
+
+        if _state.document_database is not None:
+            start = time.perf_counter()
+            if cache is not None:
+                html = cache.document_insertion(
+                    _state.document_linker, html, _state.document_database, fingerprints["document_links"],
+                )
+            else:
+                html = _state.document_linker.html_insertion(html=html, document_database=_state.document_database)
+            timings["document_links"] = time.perf_counter() - start
+
+        if _state.glossary_inserter is not None:
+            start = time.perf_counter()
+            if cache is not None:
+                html = cache.glossary_insertion(
+                    _state.glossary_inserter, html, _state.glossary_matcher, fingerprints["glossary_links"],
+                )
+            else:
+                html = _state.glossary_inserter.html_insertion(html=html, glossary=_state.glossary_matcher)
+            timings["glossary_links"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        Path(output_base).parent.mkdir(parents=True, exist_ok=True)
+        save_html(html, output_base)
+        with open(f"{output_base}.json", 'w', encoding='utf-8') as file:
+            json.dump(document_layout._asdict(), file, ensure_ascii=False)
+        timings["save"] = time.perf_counter() - start
+    except Exception as error:
+        return FileResult(path=path, timings=timings, error=f"{type(error).__name__}: {error}")
+    return FileResult(
+        path=path,
+        timings=timings,
+        error=None,
+        metrics=metrics.summary() if metrics.enabled else None,
+        unresolved=_state.document_linker.unresolved if _state.document_database is not None else None,
+    )
+
+
+def collect_tasks(inputs: List[str], output_dir: str, pattern: str) -> List[Tuple[str, str]]:
+    tasks = []
+    for input_path in map(Path, inputs):
+        if input_path.is_dir():
+            for path in sorted(input_path.rglob(pattern)):
+                relative = path.relative_to(input_path).with_suffix("")
+                tasks.append((str(path), str(Path(output_dir) / relative)))
+        else:
+            tasks.append((str(input_path), str(Path(output_dir) / input_path.stem)))
+
+    # Inputs differing only in their directory or suffix would overwrite each other's output
+    inputs_by_output = defaultdict(list)
+    for path, output_base in tasks:
+        inputs_by_output[output_base].append(path)
+    clashes = [paths for paths in inputs_by_output.values() if len(paths) > 1]
+    if clashes:
+        raise ValueError("inputs sharing an output path: " + "; ".join(", ".join(paths) for paths in clashes))
+    return tasks
+
+
+def run_batch(
+    tasks: List[Tuple[str, str]],
+    documents_path: Optional[str] = None,
+    glossary_path: Optional[str] = None,
+    glossary_artifact_path: Optional[str] = None,
+    documents_db_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 4,
+    collect_metrics: bool = False,
+    surface_forms: bool = False,
+    cache_path: Optional[str] = None,
+    cache_size: int = 1 << 30,
+    cache_paragraphs: bool = False,
+    unresolved_index_path: Optional[str] = None,
+) -> dict:
+    global _state
+    workers = workers or os.cpu_count()
+    if collect_metrics:
+        # Forked workers inherit the enabled flag and send back per-file summaries
+        metrics.enable()
+    options = {
+        "documents_path": documents_path,
+        "glossary_path": glossary_path,
+        "glossary_artifact_path": glossary_artifact_path,
+        "documents_db_path": documents_db_path,
+        "surface_forms": surface_forms,
+        "cache_path": cache_path,
+        "cache_size": cache_size,
+        "cache_paragraphs": cache_paragraphs,
+    }
+    start_methods = multiprocessing.get_all_start_methods()
+    if "fork" in start_methods:
+        # Indexes are built once and shared with the forked workers
+        _state = build_state(**options)
+        preload_state(_state)
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+
+    stage_totals = defaultdict(float)
+    stage_metrics = {"timings": defaultdict(lambda: {"calls": 0, "total": 0.0}), "counters": defaultdict(int)}
+    errors = []
+    start = time.perf_counter()
+    unresolved_index = UnresolvedIndex(unresolved_index_path) if unresolved_index_path is not None else None
+    outputs = dict(tasks)
+    with context.Pool(workers, initializer=_init_worker, initargs=(options,)) as pool:
+        for result in pool.imap_unordered(process_file, tasks, chunksize=chunksize):
+            if unresolved_index is not None and result.unresolved is not None:
+                unresolved_index.record(outputs[result.path], result.unresolved)
+            for stage, elapsed in result.timings.items():
+                stage_totals[stage] += elapsed
+            if result.metrics is not None:
+                for stage, timing in result.metrics["timings"].items():
+                    stage_metrics["timings"][stage]["calls"] += timing["calls"]
+                    stage_metrics["timings"][stage]["total"] += timing["total"]
+                for name, value in result.metrics["counters"].items():
+                    stage_metrics["counters"][name] += value
+            if result.error is not None:
+                errors.append((result.path, result.error))
+    elapsed = time.perf_counter() - start
+    if unresolved_index is not None:
+        unresolved_index.close()
+
+    processed = len(tasks) - len(errors)
+    return {
+        "files": len(tasks),
+        "processed": processed,
+        "errors": errors,
+        "workers": workers,
+        "elapsed": elapsed,
+        "files_per_second": processed / elapsed if elapsed > 0 else 0.0,
+        "stage_ms_per_file": {
+            stage: total / max(len(tasks), 1) * 1000 for stage, total in stage_totals.items()
+        },
+        "metrics": {
+            "timings": dict(sorted(stage_metrics["timings"].items())),
+            "counters": dict(sorted(stage_metrics["counters"].items())),
+        } if collect_metrics else None,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Layout and link a corpus of html documents")
+    parser.add_argument("inputs", nargs="*", help="html files or directories with them")
+    parser.add_argument("--file-list", help="text file with one html path per line")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--documents", help="json with the document registry")
+    parser.add_argument("--documents-db", help="sqlite registry, built from --documents when missing or stale")
+    parser.add_argument("--glossary", help="json with the glossary")
+    parser.add_argument("--glossary-artifact", help="compiled glossary, rebuilt when the glossary json changes")
+    parser.add_argument("--surface-forms", action="store_true",
+                        help="match glossary terms by precomputed inflected forms instead of lemmatizing every word")
+    parser.add_argument("--pattern", default="*.htm*", help="file pattern for directory inputs")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=4)
+    parser.add_argument("--cache", help="sqlite file caching results of already seen documents")
+    parser.add_argument("--cache-size", type=int, default=1024, help="cache size limit in megabytes")
+    parser.add_argument("--cache-paragraphs", action="store_true",
+                        help="cache links per paragraph, so edited revisions only relink changed paragraphs")
+    parser.add_argument("--unresolved-index",
+                        help="sqlite index of references missing from the registry, used by relink.py")
+    parser.add_argument("--metrics", action="store_true", help="collect and print per-stage metrics")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.unresolved_index and args.cache:
+        # Cached results carry no unresolved references
+        raise SystemExit("--unresolved-index cannot be used together with --cache")
+    inputs = list(args.inputs)
+    if args.file_list:
+        with open(args.file_list, 'r', encoding='utf-8') as file:
+            inputs.extend(line.strip() for line in file if line.strip())
+
+    if args.documents_db and not args.documents and not os.path.exists(args.documents_db):
+        raise SystemExit(missing_registry_message(args.documents_db))
+    try:
+        tasks = collect_tasks(inputs, args.output_dir, args.pattern)
+    except ValueError as error:
+        raise SystemExit(str(error))
+    stats = run_batch(
+        tasks,
+        documents_path=args.documents,
+        glossary_path=args.glossary,
+        glossary_artifact_path=args.glossary_artifact,
+        documents_db_path=args.documents_db,
+        workers=args.workers,
+        chunksize=args.chunksize,
+        collect_metrics=args.metrics,
+        surface_forms=args.surface_forms,
+        cache_path=args.cache,
+        cache_size=args.cache_size << 20,
+        cache_paragraphs=args.cache_paragraphs,
+        unresolved_index_path=args.unresolved_index,
+    )
+
+    print(f"{stats['processed']}/{stats['files']} files in {stats['elapsed']:.2f} s "
+          f"with {stats['workers']} workers, {stats['files_per_second']:.1f} files/s")
+    for stage, elapsed in stats["stage_ms_per_file"].items():
+        print(f"  {stage:<16} {elapsed:8.2f} ms/file")
+    if stats["metrics"] is not None:
+        for stage, timing in stats["metrics"]["timings"].items():
+            print(f"  {stage:<32} {timing['calls']:8d} calls {timing['total'] * 1000:10.2f} ms")
+        for name, value in stats["metrics"]["counters"].items():
+            print(f"  {name:<32} {value:8d}")
+    for path, error in stats["errors"]:
+        print(f"  failed {path}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import random
+from typing import List, Optional
+
+
+MONTHS = [
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря",
+]
+WORDS = [
+    "банк", "обязан", "предоставить", "сведения", "о", "кредитной", "организации", "в",
+    "соответствии", "с", "требованиями", "настоящего", "положения", "расчетного", "счета",
+    "клиента", "договором", "банковского", "вклада", "и", "порядке", "операций",
+]
+TERM_ADJECTIVES = [
+    "кредитная", "банковская", "расчетная", "кассовая", "валютная", "денежная", "платежная",
+    "клиринговая", "депозитная", "ссудная", "лицензионная", "надзорная", "резервная",
+]
+TERM_NOUNS = [
+    "организация", "операция", "система", "карта", "политика", "позиция", "гарантия",
+    "лицензия", "отчетность", "комиссия", "ставка", "услуга", "заявка", "выписка",
+]
+TERM_GENITIVES = [
+    "банка", "клиента", "счета", "вклада", "кредита", "платежа", "депозита", "резерва",
+    "займа", "векселя", "договора", "перевода",
+]
+NUMBER_SUFFIXES = ["ФЗ", "П", "У", "Т"]
+NUMBER_RANGE = 999
+
+REFERENCE_KINDS = ["regular", "regular_inverse", "worddate", "worddate_inverse", "short", "chapter"]
+
+
+def generate_number(rnd: random.Random) -> str:
+    return f"{rnd.randint(1, NUMBER_RANGE)}-{rnd.choice(NUMBER_SUFFIXES)}"
+
+
+def generate_reference(rnd: random.Random, kinds: Optional[List[str]] = None) -> str:
+    day, month, year = rnd.randint(1, 28), rnd.randint(1, 12), rnd.randint(1990, 2023)
+    number = generate_number(rnd)
+    kind = rnd.choice(kinds or REFERENCE_KINDS)
+    if kind == "regular":
+        return f"от {day:02d}.{month:02d}.{year} № {number}"
+    if kind == "regular_inverse":
+        return f"№ {number} от {day}.{month}.{year}"
+    if kind == "worddate":
+        return f"от {day} {MONTHS[month - 1]} {year} года № {number}"
+    if kind == "worddate_inverse":
+        return f"№ {number} от {day} {MONTHS[month - 1]} {year} г."
+    if kind == "chapter":
+        return f"пункт {rnd.randint(1, 9)}.{rnd.randint(1, 9)}"
+    return f"№ {number}"
+
+
+def generate_term_title(rnd: random.Random, variation_probability: float = 0.2) -> str:
+    title = f"{rnd.choice(TERM_ADJECTIVES).capitalize()} {rnd.choice(TERM_NOUNS)}"
+    if rnd.random() < 0.5:
+        title += f" {rnd.choice(TERM_GENITIVES)}"
+    if rnd.random() < variation_probability:
+        variations = rnd.sample(TERM_GENITIVES, 2)
+        title += f" ({variations[0]}, {variations[1]})"
+    return title
+
+
+def generate_glossary(size: int = 1000, variation_probability: float = 0.2, seed: int = 0) -> List[dict]:
+    rnd = random.Random(seed)
+    return [
+        {"id": i, "title": generate_term_title(rnd, variation_probability)}
+        for i in range(size)
+    ]
+
+
+def generate_variation_glossary(size: int = 500, groups: int = 4, alternatives: int = 4, seed: int = 0) -> List[dict]:
+    # A group followed by two plain words is a choice of alternatives + 1 words,
+    # so a title stands for up to (alternatives + 1) ** groups word sequences
+    rnd = random.Random(seed)
+    glossary = []
+    for i in range(size):
+        title = f"{rnd.choice(TERM_ADJECTIVES).capitalize()} {rnd.choice(TERM_NOUNS)}"
+        for _ in range(groups):
+            title += f" ({', '.join(rnd.sample(TERM_GENITIVES, alternatives))})"
+            title += f" {rnd.choice(TERM_ADJECTIVES)} {rnd.choice(TERM_NOUNS)}"
+        glossary.append({"id": i, "title": title})
+    return glossary
+
+
+def generate_registry(size: int = 10000, seed: int = 0) -> List[dict]:
+    rnd = random.Random(seed)
+    documents = []
+    for i in range(size):
+        document = {"id": i, "number": generate_number(rnd)}
+        if rnd.random() < 0.8:
+            document["date"] = f"{rnd.randint(1990, 2023)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+        documents.append(document)
+    return documents
+
+
+def _term_surface(rnd: random.Random, glossary: List[dict]) -> str:
+    title = rnd.choice(glossary)["title"]
+    return title.split(" (")[0].lower()
+
+
+def generate_paragraph(
+    rnd: random.Random,
+    references: int,
+    terms: int = 0,
+    glossary: Optional[List[dict]] = None,
+    kinds: Optional[List[str]] = None,
+) -> str:
+    words = [rnd.choice(WORDS) for _ in range(rnd.randint(10, 30))]
+    for _ in range(references):
+        words.insert(rnd.randint(0, len(words)), generate_reference(rnd, kinds))
+    if glossary:
+        for _ in range(terms):
+            words.insert(rnd.randint(0, len(words)), _term_surface(rnd, glossary))
+    text = " ".join(words)
+    if rnd.random() < 0.2:
+        text = f'<font face="Times New Roman">{text}</font>'
+    return f'<p class="MsoNormal" style="margin:0cm">{text}</p>\n'
+
+
+def generate_html(
+    paragraphs: int = 100,
+    references: int = 2,
+    seed: int = 0,
+    terms: int = 0,
+    glossary: Optional[List[dict]] = None,
+    kinds: Optional[List[str]] = None,
+) -> str:
+    rnd = random.Random(seed)
+    header = (
+        '<html><head><meta charset="utf-8"></head>\n<body lang="RU">\n'
+        '<p align="right">Руководителям кредитных организаций</p>\n'
+        f'<p>от {rnd.randint(1, 28)}.{rnd.randint(1, 12)}.2021 № {generate_number(rnd)}</p>\n'
+        '<p><i>О порядке предоставления</i>\n<i>сведений о вкладах</i></p>\n'
+    )
+    body = "".join(
+        generate_paragraph(rnd, references, terms, glossary, kinds) for _ in range(paragraphs)
+    )
+    footer = '<p><br/> </p><p>Заместитель Председателя</p><p>И.И. Иванов</p>\n<p>Исп. П.П. Петров</p>\n</body></html>'
+    return header + body + footer
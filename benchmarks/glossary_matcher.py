@@ -0,0 +1,54 @@
+import random
+import time
+from typing import Dict, List, Tuple
+
+from autoglossary.matcher import TermMatcher, WORD_REGEX
+
+
+def build_glossary(size: int, vocabulary: List[str], rnd: random.Random) -> Dict[Tuple[str, ...], int]:
+    glossary = {}
+    while len(glossary) < size:
+        termin = tuple(rnd.choice(vocabulary) for _ in range(rnd.randint(1, 4)))
+        glossary[termin] = len(glossary)
+    return glossary
+
+
+def build_tokens(amount: int, vocabulary: List[str], rnd: random.Random) -> List[str]:
+    tokens = []
+    for _ in range(amount):
+        tokens.append(rnd.choice(vocabulary))
+        tokens.append(rnd.choice([" ", ", ", "</p><p>"]))
+    return tokens
+
+
+def naive_find(lemmatized_tokens: List[str], glossary: Dict[Tuple[str, ...], int]) -> int:
+    word_positions = [i for i, token in enumerate(lemmatized_tokens) if WORD_REGEX.match(token)]
+    found = 0
+    for k in range(len(word_positions)):
+        for termin in glossary:
+            if len(termin) > len(word_positions) - k:
+                continue
+            if all(lemmatized_tokens[word_positions[k + j]] == part for j, part in enumerate(termin)):
+                found += 1
+    return found
+
+
+def measure(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rnd = random.Random(0)
+    vocabulary = [f"слово{i}" for i in range(3000)]
+    tokens = build_tokens(5000, vocabulary, rnd)
+
+    print(f"{'terms':>8} {'build, s':>10} {'trie, s':>10} {'naive, s':>10}")
+    for size in [100, 1000, 5000, 20000]:
+        glossary = build_glossary(size, vocabulary, rnd)
+        build_time = measure(TermMatcher, glossary)
+        matcher = TermMatcher(glossary)
+        trie_time = measure(matcher.find, tokens)
+        naive_time = measure(naive_find, tokens, glossary) if size <= 1000 else float("nan")
+        print(f"{size:>8} {build_time:>10.4f} {trie_time:>10.4f} {naive_time:>10.4f}")
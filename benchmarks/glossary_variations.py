@@ -0,0 +1,47 @@
+import argparse
+import time
+import tracemalloc
+
+from autoglossary import Glossary
+from autoglossary.matcher import TERM_END, TermMatcher, graph_nodes
+from autoglossary.tokenizer import Tokenizer
+from benchmarks.corpus import generate_variation_glossary
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compile glossaries with many variations into a graph and a plain trie")
+    parser.add_argument("--terms", type=int, default=500)
+    parser.add_argument("--alternatives", type=int, default=4)
+    parser.add_argument("--groups", type=int, nargs="+", default=[1, 2, 3, 4])
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    tokenizer = Tokenizer()
+    print(f"{args.terms} terms, {args.alternatives} alternatives per group")
+    print(f"{'groups':>6} {'sequences':>10} {'graph nodes':>12} {'graph, s':>9} {'graph, MB':>10} "
+          f"{'trie nodes':>11} {'trie, s':>8} {'trie, MB':>9}")
+    for groups in args.groups:
+        raw_glossary = generate_variation_glossary(args.terms, groups, args.alternatives)
+        # Lemmas are cached first, so both builds measure compilation only
+        Glossary(raw_glossary, tokenizer)
+
+        glossary, graph_time, graph_size = measure(lambda: Glossary(raw_glossary, tokenizer))
+        # The trie of every combination, as the terms were expanded before
+        matcher, trie_time, trie_size = measure(lambda: TermMatcher(dict(glossary.matcher.terms())))
+        trie_nodes = graph_nodes(matcher.trie)
+        sequences = sum(TERM_END in node for node in trie_nodes)
+        print(f"{groups:>6} {sequences:>10} {len(graph_nodes(glossary.matcher.trie)):>12} "
+              f"{graph_time:>9.2f} {graph_size / (1 << 20):>10.1f} "
+              f"{len(trie_nodes):>11} {trie_time:>8.2f} {trie_size / (1 << 20):>9.1f}")
@@ -0,0 +1,53 @@
+import argparse
+import os
+import time
+
+from autoglossary import Glossary, GlossaryLinkInserter
+from autoglossary.tokenizer import Tokenizer
+from benchmarks.corpus import generate_glossary, generate_html, generate_registry
+from document_linker import DocumentLinkInserter, DocumentDatabase
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Link one huge document sequentially and in parallel pieces")
+    parser.add_argument("--paragraphs", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--piece-size", type=int, default=1 << 20)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    raw_glossary = generate_glossary(2000)
+    html = generate_html(args.paragraphs, 2, seed=0, terms=2, glossary=raw_glossary)
+    tokenizer = Tokenizer()
+    glossary = Glossary(raw_glossary, tokenizer)
+    document_database = DocumentDatabase(documents_json=generate_registry(100000))
+    document_linker = DocumentLinkInserter()
+    glossary_linker = GlossaryLinkInserter(tokenizer)
+    print(f"{len(html) / (1 << 20):.1f} MB page, {args.workers} workers, {args.piece_size >> 10} KB pieces")
+
+    stages = {
+        "document links": (
+            lambda: document_linker.html_insertion(html, document_database),
+            lambda: document_linker.parallel_insertion(html, document_database, args.workers, args.piece_size),
+        ),
+        "glossary links": (
+            lambda: glossary_linker.html_insertion(html, glossary.matcher),
+            lambda: glossary_linker.parallel_insertion(html, glossary.matcher, args.workers, args.piece_size),
+        ),
+    }
+    for stage, (sequential, parallel) in stages.items():
+        # Lemmas cached by the sequential run are inherited by the forked workers, so
+        # the parallel run goes first to start from the same empty cache
+        tokenizer.cache_clear()
+        start = time.perf_counter()
+        parallel_html = parallel()
+        parallel_time = time.perf_counter() - start
+
+        tokenizer.cache_clear()
+        start = time.perf_counter()
+        sequential_html = sequential()
+        sequential_time = time.perf_counter() - start
+        print(f"{stage}: sequential {sequential_time:.2f} s, parallel {parallel_time:.2f} s, "
+              f"identical output: {parallel_html == sequential_html}")
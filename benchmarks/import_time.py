@@ -0,0 +1,48 @@
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict
+
+
+# Cold start budgets in milliseconds, including stdlib modules the packages pull in
+IMPORT_BUDGETS_MS = {
+    "link_common": 20.0,
+    "document_linker": 40.0,
+    "document_layout": 50.0,
+    "autoglossary": 60.0,
+}
+
+
+def measure_import(module: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for line in completed.stderr.splitlines():
+            import_obj = re.match(r"import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*(\S+)", line)
+            if import_obj and import_obj.group(2) == module:
+                timings.append(int(import_obj.group(1)) / 1000)
+    return min(timings)
+
+
+def run(repeat: int) -> Dict[str, float]:
+    return {module: measure_import(module, repeat) for module in IMPORT_BUDGETS_MS}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold import time of the packages")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    over_budget = False
+    for module, elapsed in run(args.repeat).items():
+        budget = IMPORT_BUDGETS_MS[module]
+        status = "ok" if elapsed <= budget else "OVER BUDGET"
+        over_budget = over_budget or elapsed > budget
+        print(f"{module:<16} {elapsed:7.1f} ms (budget {budget:.0f} ms) {status}")
+    sys.exit(1 if over_budget else 0)
@@ -0,0 +1,57 @@
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_html
+from document_linker.document_objects import Document, DocumentLink, IposLink
+from document_linker.pattern_handler import PatternHandler
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    return result, elapsed, blocks, size, peak
+
+
+def render_all(records):
+    # What every candidate used to carry: a link with both tags rendered
+    rendered = []
+    for record in records:
+        if isinstance(record, Document):
+            link = DocumentLink(record.start, record.end, record.id)
+        else:
+            link = IposLink(record.start, record.end, record.chapter)
+        rendered.append((link, link.open_tag, link.close_tag))
+    return records, rendered
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Allocations of the reference candidates found on a page")
+    parser.add_argument("--paragraphs", type=int, default=5000)
+    parser.add_argument("--references", type=int, default=3)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    html = generate_html(paragraphs=args.paragraphs, references=args.references)
+    pattern_handler = PatternHandler()
+    # Compiles the patterns outside of the measurements
+    pattern_handler.get_documents(html[:1000])
+
+    candidates = len(pattern_handler.get_documents(html))
+
+    print(f"{len(html) / (1 << 20):.1f} MB page, {candidates} candidates")
+    print(f"{'records':>15} {'s':>6} {'blocks each':>12} {'bytes each':>11} {'peak bytes each':>16}")
+    for name, build in [
+        ("offsets only", lambda: pattern_handler.get_documents(html)),
+        ("links rendered", lambda: render_all(pattern_handler.get_documents(html))),
+    ]:
+        _, elapsed, blocks, size, peak = measure(build)
+        print(f"{name:>15} {elapsed:>6.2f} {blocks / candidates:>12.1f} {size / candidates:>11.0f} "
+              f"{peak / candidates:>16.0f}")
@@ -0,0 +1,61 @@
+import argparse
+import time
+
+from autoglossary import Glossary, GlossaryLinkInserter
+from autoglossary.tokenizer import Tokenizer
+from benchmarks.corpus import generate_glossary, generate_html, generate_registry
+from document_layout import LayoutCollector
+from document_linker import DocumentLinkInserter, DocumentDatabase
+from pipeline import DocumentPipeline
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare the combined pipeline with the stages run one by one")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=500)
+    parser.add_argument("--references", type=int, default=2)
+    parser.add_argument("--terms", type=int, default=2)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    raw_glossary = generate_glossary(2000)
+    pages = [
+        generate_html(args.paragraphs, args.references, seed=seed, terms=args.terms, glossary=raw_glossary)
+        for seed in range(args.documents)
+    ]
+    tokenizer = Tokenizer()
+    glossary = Glossary(raw_glossary, tokenizer)
+    document_database = DocumentDatabase(documents_json=generate_registry(100000))
+
+    collector = LayoutCollector()
+    document_linker = DocumentLinkInserter()
+    glossary_linker = GlossaryLinkInserter(tokenizer)
+    pipeline = DocumentPipeline(document_database, glossary.matcher, tokenizer)
+
+    def sequential(html):
+        layout = collector.collect_data(html)
+        linked = document_linker.html_insertion(html=html, document_database=document_database)
+        return layout, glossary_linker.html_insertion(html=linked, glossary=glossary.matcher)
+
+    # Warm the lemma cache so both runs measure the steady state
+    sequential_results = [sequential(html) for html in pages]
+
+    start = time.perf_counter()
+    sequential_results = [sequential(html) for html in pages]
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pipeline_results = [pipeline.process(html) for html in pages]
+    pipeline_time = time.perf_counter() - start
+
+    identical = sum(
+        result.layout == layout and result.html == html
+        for result, (layout, html) in zip(pipeline_results, sequential_results)
+    )
+    chars = sum(map(len, pages))
+    print(f"{len(pages)} documents, {chars / len(pages):.0f} chars each")
+    print(f"sequential:  {sequential_time:.3f} s, {len(pages) / sequential_time:.1f} documents/s")
+    print(f"pipeline:    {pipeline_time:.3f} s, {len(pages) / pipeline_time:.1f} documents/s")
+    print(f"identical output: {identical}/{len(pages)}")
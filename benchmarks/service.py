@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List, Tuple
+
+from batch_process import build_state, preload_state
+from benchmarks.corpus import generate_glossary, generate_html, generate_registry
+from service import LinkingService
+
+
+async def request(port: int, path: str, body: bytes) -> Tuple[float, dict]:
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"POST /{path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    elapsed = time.perf_counter() - start
+    return elapsed, json.loads(response.split(b"\r\n\r\n", 1)[1])
+
+
+async def run_clients(port: int, pages: List[bytes], concurrency: int) -> List[float]:
+    latencies = []
+    queue = list(pages)
+
+    async def client():
+        while queue:
+            elapsed, payload = await request(port, "glossary-links", queue.pop())
+            if "error" in payload:
+                raise RuntimeError(payload["error"])
+            latencies.append(elapsed)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies
+
+
+async def measure(options: dict, workers: int, pages: List[bytes], concurrency: List[int]) -> None:
+    service = LinkingService(options, workers=workers)
+    service.start()
+    server = await asyncio.start_server(service.serve_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        await run_clients(port, pages[:workers * 2], workers)
+        for clients in concurrency:
+            start = time.perf_counter()
+            latencies = await run_clients(port, pages, clients)
+            elapsed = time.perf_counter() - start
+            latencies.sort()
+            print(f"{clients:>8} {statistics.median(latencies) * 1000:>9.1f} "
+                  f"{latencies[int(len(latencies) * 0.95)] * 1000:>9.1f} {len(pages) / elapsed:>10.1f}")
+
+        start = time.perf_counter()
+        reload_latencies = await asyncio.gather(
+            service.reload({}), run_clients(port, pages[:200], 4),
+        )
+        print(f"reload while serving: {time.perf_counter() - start:.2f} s, "
+              f"{len(reload_latencies[1])} requests answered meanwhile")
+    service.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Latency of the http service against building the state per call")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--paragraphs", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    raw_glossary = generate_glossary(2000)
+    pages = [
+        generate_html(args.paragraphs, 2, seed=seed, terms=2, glossary=raw_glossary).encode("utf-8")
+        for seed in range(args.requests)
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        options = {
+            "documents_path": os.path.join(directory, "documents.json"),
+            "glossary_path": os.path.join(directory, "glossary.json"),
+        }
+        with open(options["documents_path"], 'w', encoding='utf-8') as file:
+            json.dump(generate_registry(100000), file, ensure_ascii=False)
+        with open(options["glossary_path"], 'w', encoding='utf-8') as file:
+            json.dump(raw_glossary, file, ensure_ascii=False)
+
+        start = time.perf_counter()
+        preload_state(build_state(**options))
+        print(f"state built per call: {(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"pages of {sum(map(len, pages)) / len(pages) / 1024:.1f} KB")
+        print(f"{'clients':>8} {'p50, ms':>9} {'p95, ms':>9} {'requests/s':>10}")
+        asyncio.run(measure(options, args.workers, pages, args.concurrency))
@@ -0,0 +1,147 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from autoglossary import Glossary, GlossaryLinkInserter
+from autoglossary.tokenizer import Tokenizer
+from benchmarks.corpus import generate_glossary, generate_html, generate_registry
+from document_layout import LayoutCollector
+from document_linker import DocumentLinkInserter, DocumentDatabase
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {"min": min(timings), "mean": sum(timings) / len(timings)}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip()
+
+
+def run_suite(
+    paragraphs: int,
+    references: int,
+    terms: int,
+    glossary_size: int,
+    registry_size: int,
+    repeat: int,
+    seed: int = 0,
+) -> dict:
+    raw_glossary = generate_glossary(glossary_size, seed=seed)
+    registry = generate_registry(registry_size, seed=seed)
+    html = generate_html(paragraphs, references, seed=seed, terms=terms, glossary=raw_glossary)
+
+    tokenizer = Tokenizer()
+    # The first lemmatization loads the pymorphy2 dictionaries, keep it out of the timings
+    tokenizer.lemmatize(["прогрев"])
+
+    collector = LayoutCollector()
+    document_database = DocumentDatabase(documents_json=registry)
+    document_linker = DocumentLinkInserter()
+    glossary = Glossary(raw_glossary, tokenizer)
+    glossary_inserter = GlossaryLinkInserter(tokenizer)
+
+    def build_glossary():
+        tokenizer.cache_clear()
+        return Glossary(raw_glossary, tokenizer)
+
+    def insert_glossary():
+        tokenizer.cache_clear()
+        return glossary_inserter.html_insertion(html=html, glossary=glossary.matcher)
+
+    results = {
+        "layout": measure(lambda: collector.collect_data(html), repeat),
+        "document_links": measure(
+            lambda: document_linker.html_insertion(html=html, document_database=document_database), repeat,
+        ),
+        "glossary_build": measure(build_glossary, repeat),
+        "glossary_links": measure(insert_glossary, repeat),
+    }
+
+    return {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "parameters": {
+            "paragraphs": paragraphs,
+            "references": references,
+            "terms": terms,
+            "glossary_size": glossary_size,
+            "registry_size": registry_size,
+            "repeat": repeat,
+            "seed": seed,
+            "html_chars": len(html),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> Dict[str, float]:
+    regressions = {}
+    for name, timing in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        change = timing["min"] / previous["min"] - 1
+        print(f"{name:<16} {previous['min'] * 1000:9.2f} ms -> {timing['min'] * 1000:9.2f} ms ({change:+.1%})")
+        if change > threshold:
+            regressions[name] = change
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the layout and linking pipelines on a synthetic corpus")
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--references", type=int, default=2, help="references per paragraph")
+    parser.add_argument("--terms", type=int, default=1, help="glossary terms per paragraph")
+    parser.add_argument("--glossary-size", type=int, default=2000)
+    parser.add_argument("--registry-size", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="json file to record the results in")
+    parser.add_argument("--compare", help="json results of a previous run")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown reported as a regression")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_suite(
+        paragraphs=args.paragraphs,
+        references=args.references,
+        terms=args.terms,
+        glossary_size=args.glossary_size,
+        registry_size=args.registry_size,
+        repeat=args.repeat,
+        seed=args.seed,
+    )
+
+    for name, timing in report["results"].items():
+        print(f"{name:<16} min {timing['min'] * 1000:9.2f} ms  mean {timing['mean'] * 1000:9.2f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("regressions: " + ", ".join(f"{name} {change:+.1%}" for name, change in regressions.items()))
+            sys.exit(1)
@@ -0,0 +1,104 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import tempfile
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import batch_process
+from benchmarks.corpus import generate_glossary, generate_html, generate_registry
+
+
+MODES = ["per-worker", "fork", "preload", "preload-sqlite"]
+
+
+def memory_usage() -> Dict[str, int]:
+    # Shared pages count in full in rss, pss splits them between the processes
+    # mapping them and uss only counts the pages private to the process
+    usage = {}
+    with open("/proc/self/smaps_rollup", 'r') as file:
+        for line in file:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                usage[name] = int(value.split()[0])
+    return {"rss": usage["Rss"], "pss": usage["Pss"], "uss": usage["Private_Clean"] + usage["Private_Dirty"]}
+
+
+def process_and_measure(task: Tuple[str, str]) -> Tuple[int, Dict[str, int]]:
+    result = batch_process.process_file(task)
+    if result.error is not None:
+        raise RuntimeError(result.error)
+    # A long-running worker eventually runs a full collection, which touches every tracked object
+    gc.collect()
+    return os.getpid(), memory_usage()
+
+
+def measure(mode: str, workers: int, tasks: List[Tuple[str, str]], options: dict) -> Dict[str, float]:
+    if mode != "preload-sqlite":
+        options = {**options, "documents_db_path": None}
+    batch_process._state = None
+    if mode != "per-worker":
+        batch_process._state = batch_process.build_state(**options)
+    if mode.startswith("preload"):
+        batch_process.preload_state(batch_process._state)
+
+    context = multiprocessing.get_context("fork")
+    per_worker = {}
+    with context.Pool(workers, initializer=batch_process._init_worker, initargs=(options,)) as pool:
+        for pid, usage in pool.imap_unordered(process_and_measure, tasks, chunksize=1):
+            per_worker[pid] = usage
+
+    gc.unfreeze()
+    batch_process._state = None
+    gc.collect()
+
+    totals = defaultdict(int)
+    for usage in per_worker.values():
+        for name, value in usage.items():
+            totals[name] += value
+    return {name: total / len(per_worker) / 1024 for name, total in totals.items()}
+
+
+def write_inputs(directory: str, documents: int, registry_size: int) -> Tuple[List[Tuple[str, str]], dict]:
+    raw_glossary = generate_glossary(2000)
+    documents_path = os.path.join(directory, "documents.json")
+    glossary_path = os.path.join(directory, "glossary.json")
+    with open(documents_path, 'w', encoding='utf-8') as file:
+        json.dump(generate_registry(registry_size), file, ensure_ascii=False)
+    with open(glossary_path, 'w', encoding='utf-8') as file:
+        json.dump(raw_glossary, file, ensure_ascii=False)
+
+    tasks = []
+    for i in range(documents):
+        path = os.path.join(directory, f"{i}.htm")
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(generate_html(200, 2, seed=i, terms=2, glossary=raw_glossary))
+        tasks.append((path, os.path.join(directory, "output", str(i))))
+    options = {
+        "documents_path": documents_path,
+        "glossary_path": glossary_path,
+        "documents_db_path": os.path.join(directory, "documents.sqlite"),
+    }
+    return tasks, options
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure per-worker memory of the batch worker pool")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--registry-size", type=int, default=200000)
+    parser.add_argument("--tasks-per-worker", type=int, default=3)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        tasks, options = write_inputs(directory, max(args.workers) * args.tasks_per_worker, args.registry_size)
+        print(f"{'mode':<14} {'workers':>8} {'rss, MB':>9} {'pss, MB':>9} {'uss, MB':>9}")
+        for mode in args.modes:
+            for workers in args.workers:
+                usage = measure(mode, workers, tasks[:workers * args.tasks_per_worker], options)
+                print(f"{mode:<14} {workers:>8} {usage['rss']:>9.1f} {usage['pss']:>9.1f} {usage['uss']:>9.1f}")
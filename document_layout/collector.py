@@ -9,17 +9,29 @@ from document_layout.extractors import (
     BodyExtractor,
     DocumentLayout,
 )
+from link_common.metrics import metrics
+from document_linker.pattern_handler import PatternHandler
 
 
 class LayoutCollector:
+    def __init__(self) -> None:
+        self.pattern_handler = PatternHandler()
+
     def collect_data(self, text: str) -> DocumentLayout:
-        cleaned = BaseExtractor._clean_html(text)
+        with metrics.timer("layout.clean_html"):
+            cleaned = BaseExtractor._clean_html(text)
+
+        with metrics.timer("layout.extract"):
+            title = TitleExtractor()(cleaned)
+            body_content = BodyExtractor()(cleaned)
+            authors = AuthorExtractor()(cleaned)
 
-        title = TitleExtractor()(cleaned)
-        number = NumberExtractor()(cleaned)
-        date = DateExtractor()(cleaned)
-        authors = AuthorExtractor()(cleaned)
-        body_content = BodyExtractor()(cleaned)
+            # Number and date are taken from the first reference of the header,
+            # which ends where the title starts
+            header_end = title.start if title else body_content.end
+            number_date = self.pattern_handler._find_first_pattern(cleaned, body_content.start, header_end)
+            number = NumberExtractor.from_pattern(number_date)
+            date = DateExtractor.from_pattern(number_date)
         
         author = None
         executor = None
@@ -71,7 +83,8 @@ class LayoutCollector:
                     executor = None
                 author = None
 
-        content = cleaned[start: end]
+        with metrics.timer("layout.create_page"):
+            content = self._create_page(cleaned[start: end])
 
         return DocumentLayout(
             title=title,
@@ -81,7 +94,7 @@ class LayoutCollector:
             author=author,
             author_position=author_position,
             executor=executor,
-            content=self._create_page(content),
+            content=content,
         )
 
     def _create_page(self, content: str) -> str:
@@ -1,10 +1,49 @@
 import re
 from abc import ABC, abstractmethod
 
-from typing import NamedTuple, List
+from typing import NamedTuple, List, Optional, Union
 
 from document_linker.pattern_handler import PatternHandler
-from document_linker.document_objects import Document
+from document_linker.document_objects import Document, IposChapter
+from link_common.utils import LazyRegex
+
+
+CLEAN_TAGS_REGEX = LazyRegex(
+    r'<(?:(?<=(?P<open><))(?P<block>p|table|tr|div|h1|h2|h3|h4).*?(?P<close>>)'
+    r'|font.*?>|/font>'
+    r'|img.*?/?>|/img>'
+    r'|sup>|/sup>|sub>|/sub>'
+    r'|b>|/b>'
+    r'|a.*?>|/a>'
+    r'|span.*?>|/span>'
+    r'|hr/>'
+    r'|u>|/u>)'
+)
+# Substitutions in the order the single scan replaces them, for text it cannot handle
+CHAINED_CLEAN_REGEXES = [
+    (LazyRegex(r'<(p|table|tr|div|h1|h2|h3|h4).*?>'), r'<\1>'),
+    (LazyRegex(r'<font.*?>'), ''),
+    (LazyRegex(r'</font>'), ''),
+    (LazyRegex(r'<img.*?/?>'), ''),
+    (LazyRegex(r'</img>'), ''),
+    (LazyRegex(r'<sup>|</sup>|<sub>|</sub>'), ''),
+    (LazyRegex(r'<b>|</b>'), ''),
+    (LazyRegex(r'<a.*?>'), ''),
+    (LazyRegex(r'</a>'), ''),
+    (LazyRegex(r'<span.*?>'), ''),
+    (LazyRegex(r'</span>'), ''),
+    (LazyRegex(r'<hr/>'), ''),
+    (LazyRegex(r'<u>|</u>'), ''),
+]
+NESTED_TAG_REGEX = LazyRegex(r'<[^>]*<')
+ITALIC_RUN_REGEX = LazyRegex(r"<i>.+?</i>\s*(?:<i>.+?</i>\s*)*", re.S)
+ITALIC_TAG_REGEX = LazyRegex(r"<i>|</i>")
+NEWLINE_TAB_REGEX = LazyRegex(r'\n|\t')
+SPACES_REGEX = LazyRegex(r'(\s)+')
+AUTHOR_REGEX = LazyRegex(r'(([а-яА-ЯёЁ]\.\s*){2}[а-яА-ЯёЁ]+)|(([а-яА-ЯёЁ]+)([а-яА-ЯёЁ]\.\s*){2})')
+TITLE_REGEX = LazyRegex(r'<i>(.*?)</i>', re.S)
+BODY_OPEN_REGEX = LazyRegex(r'<body.*?>', re.S)
+BODY_CLOSE_REGEX = LazyRegex(r'</body>')
 
 
 class DocumentLayout(NamedTuple):
@@ -31,34 +70,25 @@ class BaseExtractor(ABC):
     
     @classmethod
     def _clean_html(self, text: str) -> str:
-        cleaned = re.sub('&#160;', ' ', text)
-        cleaned = re.sub(r'<(p|table|tr|div|h1|h2|h3|h4).*?>', r'<\1>', cleaned)
-        cleaned = re.sub(r'<font.*?>', '', cleaned)
-        cleaned = re.sub(r'</font>', '', cleaned)
-        cleaned = re.sub(r'<img.*?/?>', '', cleaned)
-        cleaned = re.sub(r'</img>', '', cleaned)
-        cleaned = re.sub(r'<sup>|</sup>|<sub>|</sub>', '', cleaned)
-        cleaned = re.sub(r'<b>|</b>', '', cleaned)
-        cleaned = re.sub(r'<a.*?>', '', cleaned)
-        cleaned = re.sub(r'</a>', '', cleaned)
-        cleaned = re.sub(r'<span.*?>', '', cleaned)
-        cleaned = re.sub(r'</span>', '', cleaned)
-        cleaned = re.sub(r'<hr/>', '', cleaned)
-        cleaned = re.sub(r'(<u>|</u>)', '', cleaned)
-        
-        drop_duplicates = ""
-        start = 0
-        for doubled_obj in re.finditer(r"(<i>(.|\n)+?</i>\s*)+", cleaned):
-            only_text = doubled_obj.group(0).strip()
-            only_text = re.sub(r'\n|\t', ' ', only_text)
-            only_text = re.sub(r'(\s)+', r'\1', only_text)
-            only_text = re.sub(r"<i>|</i>", "", only_text)
-            span_start, span_end = doubled_obj.span()
-            drop_duplicates += cleaned[start:span_start] + "<i>" + only_text + "</i>"
-            start = span_end
-
-        drop_duplicates += cleaned[start:]
-        return drop_duplicates
+        # Block tags lose their attributes, inline formatting tags are dropped,
+        # both in a single scan: groups that did not match expand to ''.
+        # A "<" inside a tag lets one substitution of the chain reveal a tag for the
+        # next, e.g. <a title="<b>">, so such text still goes through the chain
+        cleaned = text.replace('&#160;', ' ')
+        if NESTED_TAG_REGEX.search(cleaned) is None:
+            cleaned = CLEAN_TAGS_REGEX.sub(r'\g<open>\g<block>\g<close>', cleaned)
+        else:
+            for regex, replacement in CHAINED_CLEAN_REGEXES:
+                cleaned = regex.sub(replacement, cleaned)
+        return ITALIC_RUN_REGEX.sub(self._merge_italic_run, cleaned)
+
+    @staticmethod
+    def _merge_italic_run(italic_obj: re.Match) -> str:
+        only_text = italic_obj.group(0).strip()
+        only_text = NEWLINE_TAB_REGEX.sub(' ', only_text)
+        only_text = SPACES_REGEX.sub(r'\1', only_text)
+        only_text = ITALIC_TAG_REGEX.sub("", only_text)
+        return "<i>" + only_text + "</i>"
     
     @classmethod
     def _remove_tags(self, text: str) -> str:
@@ -68,16 +98,31 @@ class BaseExtractor(ABC):
 
 
 class AuthorExtractor(BaseExtractor):
+    tail_size = 4096
+
     def __call__(self, text: str) -> DocumentObject:
-        docs = []
-        for author_obj in re.finditer(r'(([а-яА-ЯёЁ]\.\s*){2}[а-яА-ЯёЁ]+)|(([а-яА-ЯёЁ]+)([а-яА-ЯёЁ]\.\s*){2})', text):
-            doc = self._prepare_author(author_obj)
-            docs.append(doc)
+        # Authors are signed at the end of a document, so only the tail is scanned.
+        # The scan starts right after a tag, where no author match can continue,
+        # and the tail is grown until two matches are found or the text ends.
+        tail_size = self.tail_size
+        while True:
+            scan_start = self._safe_scan_start(text, len(text) - tail_size)
+            author_objects = list(AUTHOR_REGEX.finditer(text, scan_start))
+            if len(author_objects) > 1 or scan_start == 0:
+                break
+            tail_size *= 4
+
+        docs = [self._prepare_author(author_obj) for author_obj in author_objects[-2:]]
         if len(docs) > 1:
-            return docs[-2:]
+            return docs
         if len(docs) == 1:
             return docs[0]
         return None
+
+    def _safe_scan_start(self, text: str, position: int) -> int:
+        if position <= 0:
+            return 0
+        return text.rfind(">", 0, position) + 1
     
     def _prepare_author(self, author_obj: re.Match) -> DocumentObject:
         start, end = author_obj.span()
@@ -94,8 +139,7 @@ class AuthorExtractor(BaseExtractor):
 
 class TitleExtractor(BaseExtractor):
     def __call__(self, text: str) -> DocumentObject:
-        # title_obj = re.search(r"(<i>(.|\n)+?</i>\s*)+", text)
-        title_obj = re.search(r'<i>((.|\n)*?)</i>', text)
+        title_obj = TITLE_REGEX.search(text)
         if title_obj:
             start, end = title_obj.span()
             title = title_obj.group(1).strip()
@@ -112,8 +156,8 @@ class TitleExtractor(BaseExtractor):
 
 class BodyExtractor(BaseExtractor):
     def __call__(self, text: str) -> DocumentObject:
-        _, body_open = re.search(r'<body(.|\n)*?>', text).span()
-        body_close, _ = re.search(r'</body>', text).span()
+        _, body_open = BODY_OPEN_REGEX.search(text).span()
+        body_close, _ = BODY_CLOSE_REGEX.search(text, body_open).span()
         return DocumentObject(
             content=text[body_open: body_close],
             start=body_open,
@@ -124,30 +168,32 @@ class BodyExtractor(BaseExtractor):
 class NumberExtractor(BaseExtractor):
     pattern_handler = PatternHandler()
 
-    def __call__(self, text: str) -> DocumentObject:
-        number_date_list = self.pattern_handler._find_patterns(text=text)
-        if len(number_date_list) > 0:
-            number_date = number_date_list[0]
-            if isinstance(number_date, Document):
-                return DocumentObject(
-                    content=number_date.number,
-                    start=number_date.link.start,
-                    end=number_date.link.end,
-                )
+    def __call__(self, text: str, start: int = 0, end: Optional[int] = None) -> DocumentObject:
+        return self.from_pattern(self.pattern_handler._find_first_pattern(text, start, end))
+
+    @classmethod
+    def from_pattern(cls, number_date: Union[Document, IposChapter, None]) -> DocumentObject:
+        if isinstance(number_date, Document):
+            return DocumentObject(
+                content=number_date.number,
+                start=number_date.start,
+                end=number_date.end,
+            )
         return None
     
 
 class DateExtractor(BaseExtractor):
     pattern_handler = PatternHandler()
 
-    def __call__(self, text: str) -> DocumentObject:
-        number_date_list = self.pattern_handler._find_patterns(text=text)
-        if len(number_date_list) > 0:
-            number_date = number_date_list[0]
-            if isinstance(number_date, Document):
-                return DocumentObject(
-                    content=number_date.date,
-                    start=number_date.link.start,
-                    end=number_date.link.end,
-                )
+    def __call__(self, text: str, start: int = 0, end: Optional[int] = None) -> DocumentObject:
+        return self.from_pattern(self.pattern_handler._find_first_pattern(text, start, end))
+
+    @classmethod
+    def from_pattern(cls, number_date: Union[Document, IposChapter, None]) -> DocumentObject:
+        if isinstance(number_date, Document):
+            return DocumentObject(
+                content=number_date.date,
+                start=number_date.start,
+                end=number_date.end,
+            )
         return None
@@ -1,2 +1,5 @@
 from document_linker.link_inserter import DocumentLinkInserter
-from document_linker.document_database import DocumentDatabase
+from document_linker.document_database import DocumentDatabase, SqliteDocumentDatabase
+from document_linker.unresolved_index import UnresolvedIndex
+from link_common.edits import LinkEdit, apply_edits, drop_crossing, merge_edits
+from link_common.regions import RegionIndex
@@ -1,5 +1,10 @@
+import os
+import sqlite3
 from collections import defaultdict
-from typing import Union
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+
+Reference = Tuple[str, Optional[str]]
 
 
 class DocumentDatabase:
@@ -16,6 +21,9 @@ class DocumentDatabase:
         else:
             return None
 
+    def get_ids(self, references: Iterable[Reference]) -> Dict[Reference, Union[int, None]]:
+        return {(number, date): self.get_id(number, date) for number, date in set(references)}
+
     def _create_index(self, documents_json):
         documents_search_dict = defaultdict(dict)
         for doc in documents_json:
@@ -26,4 +34,110 @@ class DocumentDatabase:
                 if date is not None:
                     documents_search_dict[number.lower()].update({date: doc_id})
                 documents_search_dict[number.lower()].update({"id": doc_id})
-        return documents_search_dict
\ No newline at end of file
+        return documents_search_dict
+
+
+class SqliteDocumentDatabase:
+    # SQLite before 3.32 binds at most 999 parameters in one statement, two per reference
+    max_variables = 999
+    batch_size = max_variables // 2
+
+    def __init__(self, path: str, mmap_size: int = 1 << 30) -> None:
+        self.path = path
+        self.mmap_size = mmap_size
+        self._connection = None
+        self._pid = None
+
+    @classmethod
+    def build(cls, documents_json: Iterable[dict], path: str, source_hash: Optional[str] = None) -> "SqliteDocumentDatabase":
+        tmp_path = f"{path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        connection = sqlite3.connect(tmp_path)
+        connection.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE dated (number TEXT NOT NULL, date TEXT NOT NULL, id INTEGER,
+                                PRIMARY KEY (number, date)) WITHOUT ROWID;
+            CREATE TABLE numbers (number TEXT NOT NULL PRIMARY KEY, id INTEGER) WITHOUT ROWID;
+            CREATE TABLE meta (key TEXT NOT NULL PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+        """)
+        if source_hash is not None:
+            connection.execute("INSERT INTO meta VALUES ('source_hash', ?)", (source_hash,))
+        dated_rows = []
+        number_rows = []
+        for doc in documents_json:
+            number = doc.get("number")
+            if number is not None:
+                date = doc.get("date")
+                doc_id = doc.get("id")
+                if date is not None:
+                    dated_rows.append((number.lower(), date, doc_id))
+                number_rows.append((number.lower(), doc_id))
+        # Later documents overwrite earlier ones, as in DocumentDatabase
+        connection.executemany("INSERT OR REPLACE INTO dated VALUES (?, ?, ?)", dated_rows)
+        connection.executemany("INSERT OR REPLACE INTO numbers VALUES (?, ?)", number_rows)
+        connection.commit()
+        connection.execute("VACUUM")
+        connection.close()
+
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    @property
+    def source_hash(self) -> Optional[str]:
+        # Hash of the json the file was built from; files built without one have none
+        try:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'source_hash'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row is not None else None
+
+    def get_id(self, number: str, date: str) -> Union[int, None]:
+        row = self.connection.execute(
+            """SELECT COALESCE(
+                (SELECT id FROM dated WHERE number = ?1 AND date = ?2),
+                (SELECT id FROM numbers WHERE number = ?1))""",
+            (number.lower(), date),
+        ).fetchone()
+        return row[0]
+
+    def get_ids(self, references: Iterable[Reference]) -> Dict[Reference, Union[int, None]]:
+        references = list(set(references))
+        doc_ids = {}
+        for i in range(0, len(references), self.batch_size):
+            batch = references[i:i + self.batch_size]
+            # References differing only in the case of the number share a row
+            lowered = defaultdict(list)
+            for number, date in batch:
+                lowered[(number.lower(), date)].append((number, date))
+            values = ", ".join(["(?, ?)"] * len(lowered))
+            rows = self.connection.execute(
+                f"""WITH refs (number, date) AS (VALUES {values})
+                SELECT refs.number, refs.date, COALESCE(dated.id, numbers.id) FROM refs
+                LEFT JOIN dated ON dated.number = refs.number AND dated.date = refs.date
+                LEFT JOIN numbers ON numbers.number = refs.number""",
+                [parameter for reference in lowered for parameter in reference],
+            )
+            for number, date, doc_id in rows:
+                for reference in lowered[(number, date)]:
+                    doc_ids[reference] = doc_id
+        return doc_ids
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # A connection must not cross a fork, so every process opens its own
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(
+                f"file:{self.path}?mode=ro&immutable=1", uri=True, check_same_thread=False
+            )
+            self._connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+            self._pid = os.getpid()
+        return self._connection
+
+    def __getstate__(self) -> dict:
+        return {"path": self.path, "mmap_size": self.mmap_size}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
@@ -1,19 +1,28 @@
 import re
 from abc import ABC, abstractmethod
-from typing import Tuple, Any, Optional
+from typing import Any, Optional
 from document_linker.utils import NUMBER_CHAR
+from link_common.utils import LazyRegex
+
+
+NUMBER_CHAR_REGEX = LazyRegex(rf'{NUMBER_CHAR}\s*')
+SPACES_REGEX = LazyRegex(r'\s*')
 
 
 class Document:
+    # Pages hold thousands of candidate references, most never linked, so a candidate
+    # keeps its offsets only and the link is built for the references emitted
+    __slots__ = ("number", "date", "id", "start", "end")
+
     def __init__(self, date: Optional[str], number: str, start: int, end: int) -> None:
         self.number = self._format_number(number)
         self.date = self._transform_date(date)
         self.id = -1
-        self.link = DocumentLink(start, end, self.id)
+        self.start = start
+        self.end = end
 
     def update_id(self, id: int):
         self.id = id
-        self.link = DocumentLink(self.link.start, self.link.end, self.id)
 
     def _transform_date(self, date: str) -> str:
         if date:
@@ -21,40 +30,55 @@ class Document:
         return None
     
     def _format_number(self, number: str) -> str:
-        cleaned = re.sub(rf'{NUMBER_CHAR}\s*', '', number)
-        return re.sub(r'\s*', '', cleaned)
+        cleaned = NUMBER_CHAR_REGEX.sub('', number)
+        return SPACES_REGEX.sub('', cleaned)
 
     def __str__(self) -> str:
-        return f"{self.__class__.__name__} number {self.number} from {self.date} pos {self.link.start}-{self.link.end} id {self.id}"
+        return f"{self.__class__.__name__} number {self.number} from {self.date} pos {self.start}-{self.end} id {self.id}"
     
     def __repr__(self) -> str:
         return self.__str__()
 
 
 class IposChapter:
+    __slots__ = ("chapter_orig", "start", "end")
+
     def __init__(self, chapter: str, start: int, end: int) -> None:
         self.chapter_orig = chapter
-        self.chapter = self._transform_chapter(self.chapter_orig)
-        self.link = IposLink(start, end, self.chapter)  
-    
+        self.start = start
+        self.end = end
+
+    @property
+    def chapter(self) -> str:
+        return self._transform_chapter(self.chapter_orig)
+
     def _transform_chapter(self, chapter: str) -> str:
         under_chapter = re.sub(r'\.', '_', chapter)
         return f"#chapter{under_chapter}"
     
     def __str__(self) -> str:
-        return f"{self.__class__.__name__} chapter {self.chapter_orig} pos {self.link.start}-{self.link.end}"
+        return f"{self.__class__.__name__} chapter {self.chapter_orig} pos {self.start}-{self.end}"
     
     def __repr__(self) -> str:
         return self.__str__()
 
 
 class BaseLink(ABC):
+    # Only offsets and the target are kept, tags are rendered for the links emitted
+    __slots__ = ("start", "end", "content")
+
     def __init__(self, start: int, end: int, content: Any) -> None:
         self.start = start
         self.end = end
-        self.open_tag = self._define_open_tag(content)
-        self.close_tag = self._define_close_tag(content)
-        self.left, self.right = self._define_existance_method(self.open_tag, self.close_tag)
+        self.content = content
+
+    @property
+    def open_tag(self) -> str:
+        return self._define_open_tag(self.content)
+
+    @property
+    def close_tag(self) -> str:
+        return self._define_close_tag(self.content)
 
     @abstractmethod
     def _define_open_tag(self, content: Any) -> str:
@@ -64,12 +88,10 @@ class BaseLink(ABC):
     def _define_close_tag(self, content: Any) -> str:
         pass
 
-    @abstractmethod
-    def _define_existance_method(self, open_tag: str, close_tag: str) -> Tuple[str, str]:
-        pass
-
 
 class DocumentLink(BaseLink):
+    __slots__ = ()
+
     def __init__(self, start, end, id) -> None:
         super().__init__(start=start, end=end, content=id)
 
@@ -78,12 +100,11 @@ class DocumentLink(BaseLink):
     
     def _define_close_tag(self, content: Any) -> str:
         return """</a>"""
-    
-    def _define_existance_method(self, open_tag: str, close_tag: str) -> Tuple[str, str]:
-        return open_tag[-15:], close_tag
 
         
 class IposLink(BaseLink):
+    __slots__ = ()
+
     def __init__(self, start, end, chapter) -> None:
         super().__init__(start=start, end=end, content=chapter)
 
@@ -94,6 +115,3 @@ class IposLink(BaseLink):
     
     def _define_close_tag(self, content: Any) -> str:
         return """</a>"""
-    
-    def _define_existance_method(self, open_tag: str, close_tag: str) -> Tuple[str, str]:
-        return open_tag[-15:], close_tag
@@ -1,35 +1,166 @@
+from typing import Iterable, List, Optional, Set, TextIO, Tuple, Union
+
 from document_linker.pattern_handler import PatternHandler
-from document_linker.document_database import DocumentDatabase
-from document_linker.document_objects import Document, BaseLink
+from document_linker.document_database import DocumentDatabase, Reference, SqliteDocumentDatabase
+from document_linker.document_objects import Document, DocumentLink, IposChapter, IposLink
+from link_common.edits import LinkEdit, apply_edits
+from link_common.metrics import metrics
+from link_common.parallel import map_pieces, split_pieces
+from link_common.regions import RegionIndex
 
 
 class DocumentLinkInserter:
     def __init__(self) -> None:
         self.pattenr_handler = PatternHandler()
+        # References of the last processed document that have no id in the registry
+        self.unresolved: List[Reference] = []
+
+    def html_insertion(self, html: str, document_database: Union[DocumentDatabase, SqliteDocumentDatabase]) -> str:
+        edits = self._collect_edits(html, document_database)
+        with metrics.timer("document_links.assemble"):
+            return apply_edits(html, edits)
+
+    def edits(
+        self,
+        html: str,
+        document_database: Union[DocumentDatabase, SqliteDocumentDatabase],
+        regions: Optional[RegionIndex] = None,
+    ) -> List[LinkEdit]:
+        # Links sorted by start, for consumers that do not need the linked html
+        return self._collect_edits(html, document_database, regions=regions)
+
+    def relink(
+        self,
+        html: str,
+        document_database: Union[DocumentDatabase, SqliteDocumentDatabase],
+        numbers: Iterable[str],
+    ) -> str:
+        # Links references to the given registry numbers in an already linked document
+        numbers = {number.lower() for number in numbers}
+        return apply_edits(html, self._collect_edits(html, document_database, numbers=numbers))
+
+    def stream_insertion(
+        self,
+        reader: TextIO,
+        writer: TextIO,
+        document_database: Union[DocumentDatabase, SqliteDocumentDatabase],
+        chunk_size: int = 1 << 20,
+    ) -> None:
+        regions = RegionIndex()
+        written = 0
+        pending = ""
+        unresolved = []
+        eof = False
+        while not eof:
+            chunk = reader.read(chunk_size)
+            eof = not chunk
+            pending += chunk
+            regions.feed(chunk)
+
+            # No reference can contain ">", so scanning restarts right after one
+            # finds the same matches as a scan of the whole document
+            cut = len(pending) if eof else pending.rfind(">") + 1
+            if cut == 0:
+                continue
+
+            text = pending[:cut]
+            edits = self._collect_edits(text, document_database, regions=regions, offset=written)
+            unresolved.extend(self.unresolved)
+            writer.write(apply_edits(text, edits))
+
+            written += cut
+            regions.forget(written)
+            pending = pending[cut:]
+        self.unresolved = unresolved
 
-    def html_insertion(self, html: str, document_database: DocumentDatabase) -> str:
-        links = self.pattenr_handler.get_documents(html)
-        html_chars = list(html)
+    def parallel_insertion(
+        self,
+        html: str,
+        document_database: Union[DocumentDatabase, SqliteDocumentDatabase],
+        workers: Optional[int] = None,
+        piece_size: int = 1 << 20,
+    ) -> str:
+        # Pieces end right after a ">", which no reference contains, so scanning them
+        # apart finds the same references as a scan of the whole document
+        lowered = html.lower()
+        pieces = split_pieces(
+            len(lowered), piece_size, lambda position: lowered.find(">", position) + 1 or len(lowered),
+        )
+        found = map_pieces(_scan_piece, (self.pattenr_handler, lowered), pieces, workers)
+        links = sorted((document for documents in found for document in documents), key=lambda x: -x.start)
+        edits = self._link_edits(links, document_database, RegionIndex(html))
+        with metrics.timer("document_links.assemble"):
+            return apply_edits(html, edits)
+
+    def _collect_edits(
+        self,
+        html: str,
+        document_database: Union[DocumentDatabase, SqliteDocumentDatabase],
+        numbers: Optional[Set[str]] = None,
+        regions: Optional[RegionIndex] = None,
+        offset: int = 0,
+    ) -> List[LinkEdit]:
+        # regions index the existing links and spans of the whole text, which starts at offset in it
+        if numbers is None:
+            links = self.pattenr_handler.get_documents(html)
+        else:
+            # Only unresolved references are relinked
+            links = self.pattenr_handler.get_documents_containing(html, numbers)
+            links = [
+                document for document in links
+                if isinstance(document, Document) and document.number.lower() in numbers
+            ]
+        return self._link_edits(links, document_database, regions or RegionIndex(html), offset)
+
+    def _link_edits(
+        self,
+        links: List[Union[Document, IposChapter]],
+        document_database: Union[DocumentDatabase, SqliteDocumentDatabase],
+        regions: RegionIndex,
+        offset: int = 0,
+    ) -> List[LinkEdit]:
+        # References already linked, or running over the bounds of a link or a span, are left as they are
+        free_links = []
+        existing = 0
         for document in links:
+            start, end = document.start + offset, document.end + offset
+            if regions.links.inside(start, end):
+                existing += 1
+            elif not regions.links.crosses(start, end) and not regions.spans.crosses(start, end):
+                free_links.append(document)
+        overlapping = len(links) - len(free_links) - existing
+        links = free_links
+
+        with metrics.timer("document_links.lookup"):
+            doc_ids = document_database.get_ids(
+                (document.number, document.date) for document in links if isinstance(document, Document)
+            )
+
+        edits = []
+        self.unresolved = []
+        for document in reversed(links):
             if isinstance(document, Document):
-                doc_id = document_database.get_id(number=document.number, date=document.date)
+                doc_id = doc_ids[(document.number, document.date)]
                 if doc_id is not None:
                     document.update_id(doc_id)
+                    target = doc_id
+                    link = DocumentLink(document.start, document.end, doc_id)
                 else:
+                    self.unresolved.append((document.number, document.date))
                     continue
+            else:
+                target = document.chapter
+                link = IposLink(document.start, document.end, target)
+
+            edits.append(LinkEdit(link.start, link.end, link.open_tag, link.close_tag, target))
+
+        metrics.count("document_links.inserted", len(edits))
+        metrics.count("document_links.existing", existing)
+        metrics.count("document_links.overlapping", overlapping)
+        metrics.count("document_links.unresolved", len(self.unresolved))
+        return edits
+
 
-            if not self._check_existing_link(document.link, html):
-                html_chars.insert(document.link.end, document.link.close_tag)
-                html_chars.insert(document.link.start, document.link.open_tag)
-        
-        linked_text = ''.join(html_chars)
-        return linked_text
-
-    def _check_existing_link(self, link: BaseLink, text: str) -> bool:
-        len_left = len(link.left)
-        len_right = len(link.right)
-        if text[link.start - len_left: link.start] == link.left \
-            and text[link.end: link.end + len_right] == link.right:
-            return True
-        return False
-    
\ No newline at end of file
+def _scan_piece(shared: Tuple[PatternHandler, str], start: int, end: int) -> List[Union[Document, IposChapter]]:
+    pattern_handler, lowered = shared
+    return pattern_handler.get_documents_in(lowered, [(start, end)])
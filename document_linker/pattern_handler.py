@@ -1,28 +1,75 @@
 import re
-from typing import List, Union
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 
 from document_linker.document_objects import Document, IposChapter
 from document_linker.utils import NUMBER_CHAR
+from link_common.metrics import metrics
+from link_common.utils import LazyRegex
+
+
+MONTHS = r"((январ\w*)|(феврал\w*)|(март\w*)|(апрел\w*)|(ма\w*)|(июн\w*)|(июл\w*)|(август\w*)|(сентябр\w*)|(октябр\w*)|(ноябр\w*)|(декабр\w*))"
+DATE_PATTERN = r"\d{1,2}\.\d{1,2}\.\d{4}"
+NUMBER_PATTERN = rf"{NUMBER_CHAR}+\s*[\d\w\-\/]+"
+
+MONTH_REGEX = LazyRegex(MONTHS)
+DIGITS_REGEX = LazyRegex(r"\d+")
+CHAPTER_NUMBER_REGEX = LazyRegex(r"((\d+\.*)+)+")
+
+
+def _worddate_pattern(prefix: str) -> str:
+    return rf"(?P<{prefix}_date>\d{{1,2}}\s+(?P<{prefix}_month>{MONTHS})\s+\d{{4}}\s*((год\w*)|(г\.))*)"
 
 
 class PatternHandler:
     def __init__(self) -> None:
         self.document_patterns, self.document_patterns_dict = self._init_patterns()
-        self.document_patterns_regex = re.compile(self.document_patterns)
+        self.document_patterns_regex = LazyRegex(self.document_patterns)
+        self.handlers = {
+            "regular": self._handle_regular,
+            "regular_inverse": self._handle_regular,
+            "worddate": self._handle_worddate,
+            "worddate_inverse": self._handle_worddate,
+            "short": self._handle_short,
+            "chapter": self._handle_chapter,
+        }
 
     def get_documents(self, text) -> List[Union[Document, IposChapter]]:
-        return sorted(self._find_patterns(text), key=lambda x: -x.link.start)
+        with metrics.timer("patterns.scan"):
+            documents = sorted(self._iter_patterns(text), key=lambda x: -x.start)
+        metrics.count("patterns.matches", len(documents))
+        return documents
+
+    def get_documents_containing(self, text: str, fragments: Iterable[str]) -> List[Union[Document, IposChapter]]:
+        # No reference contains ">", so only the pieces of text between two ">"
+        # holding one of the fragments are scanned, with the same matches as a full scan
+        lowered = text.lower()
+        windows = set()
+        for fragment in fragments:
+            position = lowered.find(fragment)
+            while position != -1:
+                window_end = lowered.find(">", position)
+                windows.add((lowered.rfind(">", 0, position) + 1, window_end if window_end != -1 else len(lowered)))
+                position = lowered.find(fragment, position + 1)
+        return self.get_documents_in(lowered, windows)
+
+    def get_documents_in(self, lowered: str, windows: Iterable[Tuple[int, int]]) -> List[Union[Document, IposChapter]]:
+        # Windows of the lowered text are scanned in place, positions are those in the whole text
+        documents = []
+        with metrics.timer("patterns.scan"):
+            for window_start, window_end in windows:
+                for obj in self.document_patterns_regex.finditer(lowered, window_start, window_end):
+                    documents.extend(self.handlers[obj.lastgroup](obj, obj.lastgroup))
+        metrics.count("patterns.matches", len(documents))
+        return sorted(documents, key=lambda x: -x.start)
 
     def _init_patterns(self) -> str:
-        document_regular_pattern = r"((от)*\s*\d{1,2}\.\d{1,2}\.\d{4}\s+" + rf"{NUMBER_CHAR}+\s*[\d\w\-\/]+)"
-        document_regular_pattern_inverse = rf"({NUMBER_CHAR}" + r"+\s*[\d\w\-\/]+\s+(от)*\s*\d{1,2}\.\d{1,2}\.\d{4})"
+        document_regular_pattern = rf"(от)*\s*(?P<regular_date>{DATE_PATTERN})\s+(?P<regular_number>{NUMBER_PATTERN})"
+        document_regular_pattern_inverse = rf"(?P<regular_inverse_number>{NUMBER_PATTERN})\s+(от)*\s*(?P<regular_inverse_date>{DATE_PATTERN})"
 
-        short_pattern = rf"({NUMBER_CHAR}+\s*[\d\w\-\/]+)"
+        short_pattern = rf"(?P<short_number>{NUMBER_PATTERN})"
 
-        months = r"((январ\w*)|(феврал\w*)|(март\w*)|(апрел\w*)|(ма\w*)|(июн\w*)|(июл\w*)|(август\w*)|(сентябр\w*)|(октябр\w*)|(ноябр\w*)|(декабр\w*))"
-        worddate_pattern = r"\d{1,2}\s+" + months + r"\s+\d{4}\s*((год\w*)|(г\.))*"
-        document_worddate_pattern = rf"(от)?\s*{worddate_pattern}(\s+{NUMBER_CHAR}+\s*[\d\w\-\/]+)"
-        document_worddate_pattern_inverse = rf"({NUMBER_CHAR}+\s*[\d\w\-\/]+)\s+(от)?\s*{worddate_pattern}"
+        document_worddate_pattern = rf"(от)?\s*{_worddate_pattern('worddate')}(\s+(?P<worddate_number>{NUMBER_PATTERN}))"
+        document_worddate_pattern_inverse = rf"(?P<worddate_inverse_number>{NUMBER_PATTERN})\s+(от)?\s*{_worddate_pattern('worddate_inverse')}"
 
         chapter_pattern = r"((раздел\w*)|(пункт\w*)|(п\.+)|(подпункт\w*)|(пп\.+))\s*(\d+[\s,\.и]*)+"
 
@@ -35,136 +82,74 @@ class PatternHandler:
             "chapter": chapter_pattern,
         }
 
-        return "|".join(document_patterns_dict.values()), document_patterns_dict
-    
+        document_patterns = "|".join(
+            f"(?P<{pattern_type}>{pattern})" for pattern_type, pattern in document_patterns_dict.items()
+        )
+        return document_patterns, document_patterns_dict
+
     def _find_patterns(self, text):
-        documents = []
-        for obj in self.document_patterns_regex.finditer(text.lower()):
-            start, _ = obj.span()
-            for pattern_type, pattern in self.document_patterns_dict.items():
-                if re.fullmatch(pattern, obj.group(0)):
-                    if pattern_type in ["regular", "regular_inverse"]:
-                        document = self._handle_regular(
-                            text=obj.group(0),
-                            pattern_type=pattern_type,
-                            global_start=start,
-                        )
-                    elif pattern_type in ["worddate", "worddate_inverse"]:
-                        document = self._handle_worddate(
-                            text=obj.group(0),
-                            pattern_type=pattern_type,
-                            global_start=start,
-                        )
-                    elif pattern_type in ["short"]:
-                        document = self._handle_short(
-                            text=obj.group(0),
-                            pattern_type=pattern_type,
-                            global_start=start,
-                        )
-                    elif pattern_type == "chapter":
-                        document = self._handle_chapter(
-                            text=obj.group(0),
-                            global_start=start,
-                        )
-                    documents.extend(document)
+        with metrics.timer("patterns.scan"):
+            documents = list(self._iter_patterns(text))
+        metrics.count("patterns.matches", len(documents))
         return documents
-                   
-
-    def _handle_regular(self, text: str, pattern_type: str, global_start: int) -> List[Document]:
-        date_regex_object = re.search(r"\d{1,2}\.\d{1,2}\.\d{4}", text)
-        date = date_regex_object.group(0)
-        start_date, end_date = date_regex_object.span()
-
-        if pattern_type == "regular":
-            offset = end_date
-        elif pattern_type == "regular_inverse":
-            offset = 0
-
-        number_regex_object = re.search(rf"{NUMBER_CHAR}+\s*([\d\w\-\/]+)", text[offset:])
-        number = number_regex_object.group(0)
-        start_number, end_number = number_regex_object.span()
-
-        if pattern_type == "regular":
-            start = start_date
-            end = end_number + end_date
-        elif pattern_type == "regular_inverse":
-            start = start_number
-            end = end_date
-        
-        start += global_start
-        end += global_start
+
+    def _find_first_pattern(self, text: str, start: int = 0, end: Optional[int] = None) -> Union[Document, IposChapter, None]:
+        with metrics.timer("patterns.first"):
+            return next(self._iter_patterns(text, start, end), None)
+
+    def _iter_patterns(self, text: str, start: int = 0, end: Optional[int] = None) -> Iterator[Union[Document, IposChapter]]:
+        lowered = text[:end].lower() if end is not None else text.lower()
+        for obj in self.document_patterns_regex.finditer(lowered, start):
+            pattern_type = obj.lastgroup
+            yield from self.handlers[pattern_type](obj, pattern_type)
+
+    def _handle_regular(self, obj: re.Match, pattern_type: str) -> List[Document]:
+        start_date, end_date = obj.span(f"{pattern_type}_date")
+        start_number, end_number = obj.span(f"{pattern_type}_number")
 
         document = Document(
-            date=date,
-            number=number,
-            start=start,
-            end=end,
+            date=obj.group(f"{pattern_type}_date"),
+            number=obj.group(f"{pattern_type}_number"),
+            start=min(start_date, start_number),
+            end=max(end_date, end_number),
         )
         return [document]
-    
-    def _handle_short(self, text: str, pattern_type: str, global_start: int) -> List[Document]:
-        number_regex_object = re.search(rf"{NUMBER_CHAR}+\s*([\d\w\-\/]+)", text)
-        number = number_regex_object.group(0)
-        start, end = number_regex_object.span()
-        
-        start += global_start
-        end += global_start
+
+    def _handle_short(self, obj: re.Match, pattern_type: str) -> List[Document]:
+        start, end = obj.span(f"{pattern_type}_number")
 
         document = Document(
             date=None,
-            number=number,
+            number=obj.group(f"{pattern_type}_number"),
             start=start,
             end=end,
         )
         return [document]
 
-    def _handle_worddate(self, text: str, pattern_type: str, global_start: int) -> List[Document]:
-        months = r"((январ\w*)|(феврал\w*)|(март\w*)|(апрел\w*)|(ма\w*)|(июн\w*)|(июл\w*)|(август\w*)|(сентябр\w*)|(октябр\w*)|(ноябр\w*)|(декабр\w*))"
+    def _handle_worddate(self, obj: re.Match, pattern_type: str) -> List[Document]:
+        start_date, end_date = obj.span(f"{pattern_type}_date")
+        start_number, end_number = obj.span(f"{pattern_type}_number")
 
-        date_regex_object = re.search(r"\d{1,2}\s+" + months + r"\s+\d{4}\s*((год\w*)|(г\.))*", text)
-        date = date_regex_object.group(0)
-        start_date, end_date = date_regex_object.span()
-        for i, month in enumerate(re.findall(months, date)[0][1:]):
-            if month != '':
+        month_obj = MONTH_REGEX.fullmatch(obj.group(f"{pattern_type}_month"))
+        for i, month in enumerate(month_obj.groups()[1:]):
+            if month is not None:
                 month_num = f"{i+1}"
                 break
-        date_list = re.findall(r'\d+', date)
+        date_list = DIGITS_REGEX.findall(obj.group(f"{pattern_type}_date"))
         date_list.insert(1, month_num)
-        date = '.'.join(date_list)
-
-        if pattern_type == "worddate":
-            offset = end_date
-        elif pattern_type == "worddate_inverse":
-            offset = 0
-
-        number_regex_object = re.search(rf"{NUMBER_CHAR}+\s*([\d\w\-\/]+)", text[offset:])
-        number = number_regex_object.group(0)
-        start_number, end_number = number_regex_object.span()
-
-        if pattern_type == "worddate":
-            start = start_date
-            end = end_number + end_date
-        elif pattern_type == "worddate_inverse":
-            start = start_number
-            end = end_date
-        
-        start += global_start
-        end += global_start
 
         document = Document(
-            date=date,
-            number=number,
-            start=start,
-            end=end,
+            date='.'.join(date_list),
+            number=obj.group(f"{pattern_type}_number"),
+            start=min(start_date, start_number),
+            end=max(end_date, end_number),
         )
         return [document]
 
-    def _handle_chapter(self, text: str, global_start: int) -> List[IposChapter]:
+    def _handle_chapter(self, obj: re.Match, pattern_type: str) -> List[IposChapter]:
         chapters = []
-        for chapter in re.finditer(r"((\d+\.*)+)+", text):
+        for chapter in CHAPTER_NUMBER_REGEX.finditer(obj.string, *obj.span(pattern_type)):
             start, end = chapter.span()
-            start += global_start
-            end += global_start
             chapter_str = chapter.group(0)
 
             ipoz_chapter = IposChapter(
@@ -0,0 +1,60 @@
+import sqlite3
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+from document_linker.document_database import Reference
+
+
+class UnresolvedIndex:
+    # SQLite limits the number of bound parameters in one statement
+    batch_size = 400
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._connection = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS unresolved (number TEXT NOT NULL, date TEXT NOT NULL,
+                                                       document TEXT NOT NULL,
+                                                       PRIMARY KEY (number, date, document)) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS unresolved_document ON unresolved (document);
+            """)
+        return self._connection
+
+    def record(self, document: str, references: Iterable[Reference], numbers: Optional[Iterable[str]] = None) -> None:
+        # Replaces the unresolved references of the document, or only those to the given numbers
+        with self.connection:
+            if numbers is None:
+                self.connection.execute("DELETE FROM unresolved WHERE document = ?", (document,))
+            else:
+                self.connection.executemany(
+                    "DELETE FROM unresolved WHERE document = ? AND number = ?",
+                    [(document, number.lower()) for number in set(numbers)],
+                )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO unresolved VALUES (?, ?, ?)",
+                [(number.lower(), date or "", document) for number, date in references],
+            )
+
+    def affected(self, numbers: Iterable[str]) -> Dict[str, Set[str]]:
+        # A registry entry with a known number resolves references to it with any date,
+        # so every document referring to one of the numbers has to be relinked
+        numbers = sorted({number.lower() for number in numbers})
+        documents = defaultdict(set)
+        for i in range(0, len(numbers), self.batch_size):
+            batch = numbers[i:i + self.batch_size]
+            placeholders = ",".join("?" * len(batch))
+            for document, number in self.connection.execute(
+                f"SELECT document, number FROM unresolved WHERE number IN ({placeholders})", batch,
+            ):
+                documents[document].add(number)
+        return dict(documents)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -1 +1 @@
-NUMBER_CHAR = "(№|N|No|Nо|Ви|ви|Bи|Вх|вх|Bx|Bх|Bх|Вн|вн|Bн)"
\ No newline at end of file
+NUMBER_CHAR = "(№|N|No|Nо|Ви|ви|Bи|Вх|вх|Bx|Bх|Bх|Вн|вн|Bн)"
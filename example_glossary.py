@@ -10,5 +10,5 @@ if __name__ == "__main__":
     glossary = Glossary(raw_glossary, tokenizer)
     glossary_inserter = GlossaryLinkInserter(tokenizer)
 
-    linked_html = glossary_inserter.html_insertion(html=orig_html, glossary=glossary.dictionary)
+    linked_html = glossary_inserter.html_insertion(html=orig_html, glossary=glossary.matcher)
     save_html(linked_html, "linked_ass")
@@ -0,0 +1,2 @@
+from link_common.edits import LinkEdit, apply_edits, drop_crossing, merge_edits
+from link_common.regions import RegionIndex
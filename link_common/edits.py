@@ -0,0 +1,56 @@
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from typing import List, NamedTuple, Sequence, Tuple, Union
+
+
+class LinkEdit(NamedTuple):
+    start: int
+    end: int
+    open_tag: str
+    close_tag: str
+    # Document id, chapter anchor or glossary item id
+    target: Union[int, str]
+
+
+def merge_edits(*edit_lists: Sequence[LinkEdit]) -> List[Tuple[int, str]]:
+    # At one offset links are closed before others are opened; the longer link,
+    # or the one from the earlier list, is opened first and closed last
+    keyed = []
+    for priority, edits in enumerate(edit_lists):
+        for edit in edits:
+            keyed.append(((edit.start, 1, -edit.end, priority), edit.open_tag))
+            keyed.append(((edit.end, 0, -edit.start, -priority), edit.close_tag))
+    keyed.sort(key=itemgetter(0))
+    return [(key[0], tag) for key, tag in keyed]
+
+
+def drop_crossing(edits: Sequence[LinkEdit], protected: Sequence[LinkEdit]) -> List[LinkEdit]:
+    # Drops the edits partly overlapping a protected one, nesting either way is kept.
+    # The protected edits are sorted by start and do not overlap each other.
+    starts = [edit.start for edit in protected]
+    ends = [edit.end for edit in protected]
+    kept = []
+    for edit in edits:
+        overlapping = protected[bisect_right(ends, edit.start):bisect_left(starts, edit.end)]
+        if all(
+            other.start <= edit.start and edit.end <= other.end or edit.start <= other.start and other.end <= edit.end
+            for other in overlapping
+        ):
+            kept.append(edit)
+    return kept
+
+
+def apply_edits(text: str, *edit_lists: Sequence[LinkEdit]) -> str:
+    return splice_insertions(text, merge_edits(*edit_lists))
+
+
+def splice_insertions(text: str, insertions: List[Tuple[int, str]]) -> str:
+    parts = []
+    previous = 0
+    for offset, insertion in sorted(insertions, key=itemgetter(0)):
+        parts.append(text[previous:offset])
+        parts.append(insertion)
+        previous = offset
+    parts.append(text[previous:])
+    return "".join(parts)
+
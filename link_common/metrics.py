@@ -0,0 +1,82 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Dict, List
+
+
+# Hooks get every recorded value: ("timing", stage, seconds) or ("counter", name, amount)
+MetricsHook = Callable[[str, str, float], None]
+
+_DISABLED_TIMER = nullcontext()
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.hooks: List[MetricsHook] = []
+        self.reset()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        self.timings: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    def add_hook(self, hook: MetricsHook) -> None:
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: MetricsHook) -> None:
+        self.hooks.remove(hook)
+
+    def timer(self, stage: str) -> ContextManager:
+        if not self.enabled:
+            return _DISABLED_TIMER
+        return self._timer(stage)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if not self.enabled:
+            return
+        self.counters[name] += amount
+        for hook in self.hooks:
+            hook("counter", name, amount)
+
+    def summary(self) -> dict:
+        return {
+            "timings": {
+                stage: {"calls": self.calls[stage], "total": total}
+                for stage, total in sorted(self.timings.items())
+            },
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def dump(self) -> str:
+        lines = [f"{'stage':<32} {'calls':>8} {'total, ms':>12} {'per call, ms':>13}"]
+        for stage, total in sorted(self.timings.items()):
+            calls = self.calls[stage]
+            lines.append(f"{stage:<32} {calls:>8} {total * 1000:>12.2f} {total * 1000 / calls:>13.3f}")
+        if self.counters:
+            lines.append("")
+            lines.append(f"{'counter':<32} {'value':>8}")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name:<32} {value:>8}")
+        return "\n".join(lines)
+
+    @contextmanager
+    def _timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[stage] += elapsed
+            self.calls[stage] += 1
+            for hook in self.hooks:
+                hook("timing", stage, elapsed)
+
+
+metrics = Metrics()
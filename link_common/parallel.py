@@ -0,0 +1,51 @@
+import os
+from typing import Any, Callable, List, Optional, Tuple
+
+# Piece bounds, end excluded
+Piece = Tuple[int, int]
+
+# Data shared with the workers of the running map_pieces call
+_shared = None
+
+
+def split_pieces(length: int, piece_size: int, next_cut: Callable[[int], int]) -> List[Piece]:
+    # next_cut(position) returns the first safe boundary at or after the position
+    pieces = []
+    start = 0
+    while start < length:
+        end = length
+        if start + piece_size < length:
+            end = min(next_cut(start + piece_size), length)
+        pieces.append((start, end))
+        start = end
+    return pieces
+
+
+def _run_piece(task: Tuple[Callable[[Any, int, int], Any], int, int]) -> Any:
+    function, start, end = task
+    return function(_shared, start, end)
+
+
+def map_pieces(
+    function: Callable[[Any, int, int], Any], shared: Any, pieces: List[Piece], workers: Optional[int] = None,
+) -> List[Any]:
+    # Workers are forked with the shared data in place, so only the piece bounds are
+    # sent to them; function has to be defined at module level
+    global _shared
+    # Imported here: multiprocessing alone would take a third of the package import budget
+    import multiprocessing
+
+    workers = min(workers or os.cpu_count(), len(pieces))
+    # Pool workers, e.g. those of batch_process, are daemonic and may not start processes
+    # of their own, so the pieces are mapped in place there
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods() \
+            or multiprocessing.current_process().daemon:
+        return [function(shared, start, end) for start, end in pieces]
+
+    _shared = shared
+    try:
+        context = multiprocessing.get_context("fork")
+        with context.Pool(workers) as pool:
+            return pool.map(_run_piece, [(function, start, end) for start, end in pieces], chunksize=1)
+    finally:
+        _shared = None
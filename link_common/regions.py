@@ -0,0 +1,100 @@
+import re
+import sys
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple
+
+from link_common.utils import LazyRegex
+
+
+TAG_REGEX = LazyRegex(r"<(/?)(a|span)\b([^>]*)>", re.I)
+ABBR_CLASS_REGEX = LazyRegex(r"""\bclass\s*=\s*["']?abbr\b""", re.I)
+
+# Elements still open at the end of the text read so far reach to its end
+OPEN_END = sys.maxsize
+
+# Element start, content start, content end, element end
+Element = Tuple[int, int, int, int]
+
+
+class Regions:
+    def __init__(self, elements: List[Element]) -> None:
+        # An element nested in another one of the same kind adds nothing
+        outer = []
+        for element in sorted(elements):
+            if outer and element[3] <= outer[-1][3]:
+                continue
+            outer.append(element)
+        self.starts = [element[0] for element in outer]
+        self.content_starts = [element[1] for element in outer]
+        self.content_ends = [element[2] for element in outer]
+        self.ends = [element[3] for element in outer]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def inside(self, start: int, end: int) -> bool:
+        i = bisect_right(self.content_starts, start) - 1
+        return i >= 0 and end <= self.content_ends[i]
+
+    def crosses(self, start: int, end: int) -> bool:
+        # Overlaps an element without being inside its content or holding it whole
+        for i in range(bisect_right(self.ends, start), bisect_left(self.starts, end)):
+            inside = self.content_starts[i] <= start and end <= self.content_ends[i]
+            around = start <= self.starts[i] and self.ends[i] <= end
+            if not inside and not around:
+                return True
+        return False
+
+
+class RegionIndex:
+    def __init__(self, text: str = "") -> None:
+        self._elements = {"a": [], "span": []}
+        # Name, element start, content start and whether the element is indexed
+        self._open = []
+        self._offset = 0
+        self._tail = ""
+        self.feed(text)
+
+    def feed(self, text: str) -> None:
+        # Offsets continue over the pieces; text after an unfinished tag waits for the next piece
+        text = self._tail + text
+        cut = text.rfind("<")
+        if cut == -1 or text.find(">", cut) != -1:
+            cut = len(text)
+
+        for tag in TAG_REGEX.finditer(text, 0, cut):
+            closing, name, attributes = tag.groups()
+            name = name.lower()
+            if attributes.endswith("/"):
+                continue
+            start = self._offset + tag.start()
+            end = self._offset + tag.end()
+            if not closing:
+                indexed = name == "a" or ABBR_CLASS_REGEX.search(attributes) is not None
+                self._open.append((name, start, end, indexed))
+                continue
+
+            for i in range(len(self._open) - 1, -1, -1):
+                if self._open[i][0] == name:
+                    _, element_start, content_start, indexed = self._open.pop(i)
+                    if indexed:
+                        self._elements[name].append((element_start, content_start, start, end))
+                    break
+
+        self._offset += cut
+        self._tail = text[cut:]
+        self._build()
+
+    def forget(self, before: int) -> None:
+        # Drops the elements closed before the offset, no longer needed by a stream
+        for name, elements in self._elements.items():
+            self._elements[name] = [element for element in elements if element[3] > before]
+        self._build()
+
+    def _build(self) -> None:
+        unclosed = {"a": [], "span": []}
+        for name, start, content_start, indexed in self._open:
+            if indexed:
+                unclosed[name].append((start, content_start, OPEN_END, OPEN_END))
+        self.links = Regions(self._elements["a"] + unclosed["a"])
+        self.spans = Regions(self._elements["span"] + unclosed["span"])
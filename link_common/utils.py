@@ -0,0 +1,17 @@
+import re
+
+
+class LazyRegex:
+    def __init__(self, pattern: str, flags: int = 0) -> None:
+        self.pattern = pattern
+        self.flags = flags
+
+    def __getattr__(self, name: str):
+        # Compiled on first use; the looked up method is cached on the instance,
+        # so later calls do not go through __getattr__ again
+        if name.startswith("__"):
+            raise AttributeError(name)
+        compiled = re.compile(self.pattern, self.flags)
+        attribute = getattr(compiled, name)
+        setattr(self, name, attribute)
+        return attribute
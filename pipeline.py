@@ -0,0 +1,69 @@
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from autoglossary import GlossaryLinkInserter, SurfaceIndex, TermMatcher
+from autoglossary.tokenizer import Tokenizer
+from document_layout import LayoutCollector
+from document_layout.extractors import DocumentLayout
+from document_linker import DocumentLinkInserter, DocumentDatabase, SqliteDocumentDatabase
+from link_common.edits import LinkEdit, apply_edits, drop_crossing
+from link_common.metrics import metrics
+from link_common.regions import RegionIndex
+
+
+class PipelineResult(NamedTuple):
+    layout: DocumentLayout
+    html: str
+    document_edits: List[LinkEdit]
+    glossary_edits: List[LinkEdit]
+
+
+class DocumentPipeline:
+    # Runs the three stages over one page and splices both link lists into it at once.
+    # Shared: the index of the existing links and spans, and the single splice, which
+    # replaces a second full copy of the page and resolves overlaps with one priority.
+    # Not shared: layout works on its own cleaned copy, the document scan lowercases the
+    # page and the glossary inserter tokenizes it, as when the stages run one by one.
+    def __init__(
+        self,
+        document_database: Union[DocumentDatabase, SqliteDocumentDatabase, None] = None,
+        glossary: Optional[TermMatcher] = None,
+        tokenizer: Optional[Tokenizer] = None,
+        surface_index: Optional[SurfaceIndex] = None,
+        glossary_priority: bool = False,
+    ) -> None:
+        self.collector = LayoutCollector()
+        self.document_linker = DocumentLinkInserter()
+        self.document_database = document_database
+        self.glossary = glossary
+        self.glossary_linker = GlossaryLinkInserter(tokenizer or Tokenizer(), surface_index) if glossary else None
+        # Document links win over glossary spans partly overlapping them unless told otherwise;
+        # a span inside a link, or a link inside a span, is kept either way
+        self.glossary_priority = glossary_priority
+
+    def process(self, html: str) -> PipelineResult:
+        layout = self.collector.collect_data(html)
+        document_edits, glossary_edits = self.edits(html)
+        with metrics.timer("pipeline.assemble"):
+            if self.glossary_priority:
+                linked_html = apply_edits(html, glossary_edits, document_edits)
+            else:
+                linked_html = apply_edits(html, document_edits, glossary_edits)
+        return PipelineResult(layout, linked_html, document_edits, glossary_edits)
+
+    def edits(self, html: str) -> Tuple[List[LinkEdit], List[LinkEdit]]:
+        # Both stages read the original page, so the glossary never tokenizes html holding
+        # the document links, and one index of its existing links serves both
+        regions = RegionIndex(html)
+        document_edits = []
+        if self.document_database is not None:
+            document_edits = self.document_linker.edits(html, self.document_database, regions)
+
+        glossary_edits = []
+        if self.glossary_linker is not None:
+            glossary_edits = self.glossary_linker.edits(html, self.glossary, regions)
+
+        if self.glossary_priority:
+            document_edits = drop_crossing(document_edits, glossary_edits)
+        else:
+            glossary_edits = drop_crossing(glossary_edits, document_edits)
+        return document_edits, glossary_edits
@@ -0,0 +1,50 @@
+import argparse
+import time
+from typing import List, Optional
+
+from document_linker import DocumentLinkInserter, DocumentDatabase, SqliteDocumentDatabase, UnresolvedIndex
+from utils import load_html, load_json, save_html
+
+
+def relink(
+    unresolved_index: UnresolvedIndex,
+    delta: List[dict],
+    document_database,
+    document_linker: Optional[DocumentLinkInserter] = None,
+) -> int:
+    document_linker = document_linker or DocumentLinkInserter()
+    numbers = {doc["number"] for doc in delta if doc.get("number") is not None}
+    affected = unresolved_index.affected(numbers)
+    for output_base, document_numbers in sorted(affected.items()):
+        html = load_html(f"{output_base}.html")
+        html = document_linker.relink(html, document_database, document_numbers)
+        save_html(html, output_base)
+        unresolved_index.record(output_base, document_linker.unresolved, document_numbers)
+    return len(affected)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Link references to newly registered documents in processed html")
+    parser.add_argument("--unresolved-index", required=True, help="index written by batch_process.py")
+    parser.add_argument("--delta", required=True, help="json with the documents added to the registry")
+    parser.add_argument("--documents", help="json with the updated document registry")
+    parser.add_argument("--documents-db", help="sqlite registry built from the updated registry")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.documents_db is not None:
+        document_database = SqliteDocumentDatabase(args.documents_db)
+    else:
+        document_database = DocumentDatabase(documents_json=load_json(args.documents))
+
+    start = time.perf_counter()
+    unresolved_index = UnresolvedIndex(args.unresolved_index)
+    relinked = relink(unresolved_index, load_json(args.delta), document_database)
+    unresolved_index.close()
+    print(f"relinked {relinked} documents in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Callable, Dict, Iterable, List, Union
+
+from autoglossary import GlossaryLinkInserter, TermMatcher
+from document_layout import LayoutCollector
+from document_layout.extractors import DocumentLayout
+from document_linker import DocumentLinkInserter
+from link_common.metrics import metrics
+from link_common.utils import LazyRegex
+
+
+# Bump whenever a code change alters the layout or the linked html
+CACHE_VERSION = 1
+
+PARAGRAPH_END_REGEX = LazyRegex(r"</p\s*>", re.I)
+
+
+def content_hash(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8", "surrogatepass"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def split_paragraphs(html: str) -> List[str]:
+    segments = []
+    start = 0
+    for match in PARAGRAPH_END_REGEX.finditer(html):
+        segments.append(html[start:match.end()])
+        start = match.end()
+    segments.append(html[start:])
+    return segments
+
+
+class ResultCache:
+    # SQLite limits the number of bound parameters in one statement
+    batch_size = 400
+
+    def __init__(self, path: str, max_size: int = 1 << 30, paragraphs: bool = False) -> None:
+        self.path = path
+        self.max_size = max_size
+        # Link each paragraph on its own, so an edited revision only relinks the changed ones.
+        # Terms and references running over a paragraph end are not linked in this mode.
+        self.paragraphs = paragraphs
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # A connection must not cross a fork, each worker opens its own
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._connection.executescript("""
+                PRAGMA journal_mode = WAL;
+                PRAGMA synchronous = NORMAL;
+                CREATE TABLE IF NOT EXISTS entries (key TEXT NOT NULL PRIMARY KEY, value TEXT NOT NULL,
+                                                    size INTEGER NOT NULL, used REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+                -- Running total of the entry sizes, kept by triggers in the writing transaction
+                CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);
+                INSERT OR IGNORE INTO meta VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM entries));
+                CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries
+                    BEGIN UPDATE meta SET total = total + new.size; END;
+                CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries
+                    BEGIN UPDATE meta SET total = total + new.size - old.size; END;
+                CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries
+                    BEGIN UPDATE meta SET total = total - old.size; END;
+            """)
+            self._pid = os.getpid()
+        return self._connection
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(set(keys))
+        found = {}
+        for i in range(0, len(keys), self.batch_size):
+            batch = keys[i:i + self.batch_size]
+            placeholders = ",".join("?" * len(batch))
+            found.update(self.connection.execute(
+                f"SELECT key, value FROM entries WHERE key IN ({placeholders})", batch,
+            ))
+        if found:
+            now = time.time()
+            self.connection.executemany("UPDATE entries SET used = ? WHERE key = ?", [(now, key) for key in found])
+        return found
+
+    def put_many(self, items: Dict[str, str]) -> None:
+        if not items:
+            return
+        now = time.time()
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # An upsert rather than a replace, whose implicit delete would not fire the trigger
+            connection.executemany(
+                """INSERT INTO entries VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE
+                SET value = excluded.value, size = excluded.size, used = excluded.used""",
+                [(key, value, len(value.encode("utf-8", "surrogatepass")), now) for key, value in items.items()],
+            )
+            self._evict()
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def clear(self) -> None:
+        self.connection.execute("DELETE FROM entries")
+
+    def size(self) -> int:
+        return self.connection.execute("SELECT total FROM meta").fetchone()[0]
+
+    def collect_data(self, collector: LayoutCollector, html: str, fingerprint: str = "") -> DocumentLayout:
+        # The layout depends on the whole document, so it is cached per document only
+        key = content_hash(str(CACHE_VERSION), "layout", fingerprint, html)
+        cached = self.get_many([key]).get(key)
+        if cached is not None:
+            metrics.count("cache.hits")
+            return DocumentLayout(**json.loads(cached))
+
+        metrics.count("cache.misses")
+        document_layout = collector.collect_data(html)
+        self.put_many({key: json.dumps(document_layout._asdict(), ensure_ascii=False)})
+        return document_layout
+
+    def document_insertion(
+        self, linker: DocumentLinkInserter, html: str, document_database, fingerprint: str = "",
+    ) -> str:
+        return self._transform(
+            "document_links", html, fingerprint,
+            lambda text: linker.html_insertion(html=text, document_database=document_database),
+        )
+
+    def glossary_insertion(
+        self, inserter: GlossaryLinkInserter, html: str, glossary: Union[dict, TermMatcher], fingerprint: str = "",
+    ) -> str:
+        # The matching modes change the spans found, so entries made in another mode never match
+        modes = f"surface_forms={inserter.surface_index is not None} markup_aware={inserter.markup_aware}"
+        return self._transform(
+            "glossary_links", html, content_hash(fingerprint, modes),
+            lambda text: inserter.html_insertion(html=text, glossary=glossary),
+        )
+
+    def _transform(self, stage: str, html: str, fingerprint: str, transform: Callable[[str], str]) -> str:
+        segments = split_paragraphs(html) if self.paragraphs else [html]
+        keys = [content_hash(str(CACHE_VERSION), stage, fingerprint, segment) for segment in segments]
+        found = self.get_many(keys)
+
+        computed = {}
+        results = []
+        for key, segment in zip(keys, segments):
+            result = found.get(key)
+            if result is None:
+                result = computed.get(key)
+            if result is None:
+                result = computed[key] = transform(segment)
+            results.append(result)
+
+        metrics.count("cache.hits", len(segments) - len(computed))
+        metrics.count("cache.misses", len(computed))
+        self.put_many(computed)
+        return "".join(results)
+
+    def _evict(self) -> None:
+        excess = self.size() - self.max_size
+        if excess <= 0:
+            return
+        # Evict a little more than needed so that every insert does not evict again
+        excess += self.max_size // 10
+        evicted = []
+        for key, size in self.connection.execute("SELECT key, size FROM entries ORDER BY used"):
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.connection.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        metrics.count("cache.evicted", len(evicted))
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        state["_pid"] = None
+        return state
@@ -0,0 +1,330 @@
+import argparse
+import asyncio
+import gc
+import json
+import multiprocessing
+import os
+import time
+from http import HTTPStatus
+from typing import List, Optional, Tuple
+
+import batch_process
+from batch_process import BatchState, build_state, missing_registry_message, preload_state
+
+
+ENDPOINTS = ["layout", "document-links", "glossary-links"]
+
+# Accepted json types of the build_state options a reload can change
+OPTION_TYPES = {
+    "documents_path": (str, type(None)),
+    "glossary_path": (str, type(None)),
+    "glossary_artifact_path": (str, type(None)),
+    "documents_db_path": (str, type(None)),
+    "surface_forms": (bool,),
+    "cache_path": (str, type(None)),
+    "cache_size": (int,),
+    "cache_paragraphs": (bool,),
+}
+
+# Endpoint, html and the future waiting for the result
+PendingRequest = Tuple[str, str, asyncio.Future]
+
+
+def handle_request(endpoint: str, html: str) -> Tuple[int, dict]:
+    state = batch_process._state
+    try:
+        if endpoint == "layout":
+            return HTTPStatus.OK, state.collector.collect_data(html)._asdict()
+        if endpoint == "document-links":
+            html = state.document_linker.html_insertion(html=html, document_database=state.document_database)
+            return HTTPStatus.OK, {"html": html, "unresolved": state.document_linker.unresolved}
+        html = state.glossary_inserter.html_insertion(html=html, glossary=state.glossary_matcher)
+        return HTTPStatus.OK, {"html": html}
+    except Exception as error:
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(error).__name__}: {error}"}
+
+
+# Error met by a worker building its own state
+_init_error: Optional[str] = None
+
+
+def init_worker(options: dict) -> None:
+    # Workers started by the forkserver build and warm their own state. A failure is kept
+    # for worker_status: a worker raising here would be restarted by the pool for ever
+    global _init_error
+    if batch_process._state is None:
+        try:
+            batch_process._init_worker(options)
+            preload_state(batch_process._state)
+        except Exception as error:
+            _init_error = f"{type(error).__name__}: {error}"
+
+
+def summarize_state(state: BatchState) -> dict:
+    return {"documents": state.document_database is not None, "glossary": state.glossary_inserter is not None}
+
+
+def worker_status(_: int) -> dict:
+    if batch_process._state is None:
+        return {"error": _init_error}
+    return summarize_state(batch_process._state)
+
+
+def handle_batch(requests: List[Tuple[str, str]]) -> List[Tuple[int, dict]]:
+    return [handle_request(endpoint, html) for endpoint, html in requests]
+
+
+class MicroBatcher:
+    def __init__(self, service: "LinkingService", max_batch: int, max_delay: float, max_batched_size: int) -> None:
+        self.service = service
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        # Larger pages are worth a task of their own
+        self.max_batched_size = max_batched_size
+        self.pending: List[PendingRequest] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def submit(self, endpoint: str, html: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        if len(html) > self.max_batched_size:
+            self.service.dispatch([(endpoint, html, future)])
+            return future
+
+        self.pending.append((endpoint, html, future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self.flush)
+        return future
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.pending:
+            batch, self.pending = self.pending, []
+            self.service.dispatch(batch)
+
+
+class LinkingService:
+    def __init__(
+        self,
+        options: dict,
+        workers: Optional[int] = None,
+        max_batch: int = 16,
+        max_delay: float = 0.002,
+        max_batched_size: int = 1 << 16,
+    ) -> None:
+        self.options = options
+        self.workers = workers or multiprocessing.cpu_count()
+        self.batcher = MicroBatcher(self, max_batch, max_delay, max_batched_size)
+        # Only what the workers loaded is kept here, the state itself lives in them
+        self.loaded = {}
+        self.pool = None
+        self.loaded_at = None
+        self._reload_lock = asyncio.Lock()
+
+    def start(self) -> None:
+        # No other thread runs yet, so the first workers can be forked with the state in place
+        batch_process._state = build_state(**self.options)
+        preload_state(batch_process._state)
+        self.loaded = summarize_state(batch_process._state)
+        self.pool = self._start_pool(self.options, "fork")
+        self.loaded_at = time.time()
+
+    def close(self) -> None:
+        self.batcher.flush()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+    async def reload(self, changes: dict) -> None:
+        # Requests keep going to the old workers while the new ones start; the old pool is
+        # closed once it has finished the batches already sent to it. By now the executor and
+        # the old pool run threads, which a forked child would copy mid-operation, so the new
+        # workers come from the forkserver and build the state themselves; the parent
+        # never holds a second copy of it
+        async with self._reload_lock:
+            options = {**self.options, **changes}
+            loop = asyncio.get_running_loop()
+            pool = self._start_pool(options, "forkserver")
+            statuses = await loop.run_in_executor(None, pool.map, worker_status, range(self.workers), 1)
+            errors = [status["error"] for status in statuses if "error" in status]
+            if errors:
+                await loop.run_in_executor(None, pool.terminate)
+                raise RuntimeError(f"workers failed to load the state: {errors[0]}")
+            old_pool = self.pool
+            self.batcher.flush()
+            self.loaded, self.pool = statuses[0], pool
+            self.options = options
+            self.loaded_at = time.time()
+            # The state built by start is no longer needed once its workers are gone
+            batch_process._state = None
+            gc.unfreeze()
+            old_pool.close()
+            await loop.run_in_executor(None, old_pool.join)
+
+    def dispatch(self, batch: List[PendingRequest]) -> None:
+        loop = asyncio.get_running_loop()
+
+        def resolve(results: List[Tuple[int, dict]]) -> None:
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+        def fail(error: BaseException) -> None:
+            result = (HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(error).__name__}: {error}"})
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_result(result)
+
+        # Pool callbacks run in its result thread
+        self.pool.apply_async(
+            handle_batch,
+            ([(endpoint, html) for endpoint, html, _ in batch],),
+            callback=lambda results: loop.call_soon_threadsafe(resolve, results),
+            error_callback=lambda error: loop.call_soon_threadsafe(fail, error),
+        )
+
+    async def handle(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        path = path.split("?", 1)[0].strip("/")
+        if method == "GET" and path == "health":
+            return HTTPStatus.OK, {
+                "workers": self.workers,
+                "loaded_at": self.loaded_at,
+                **self.loaded,
+            }
+        if method == "POST" and path == "reload":
+            changes = json.loads(body) if body else {}
+            if not isinstance(changes, dict):
+                return HTTPStatus.BAD_REQUEST, {"error": "reload body must be a JSON object"}
+            unknown = set(changes) - set(self.options)
+            if unknown:
+                return HTTPStatus.BAD_REQUEST, {"error": f"unknown options: {', '.join(sorted(unknown))}"}
+            mistyped = sorted(
+                name for name, value in changes.items()
+                # Compared exactly, as json true would pass for an int
+                if type(value) not in OPTION_TYPES.get(name, (type(value),))
+            )
+            if mistyped:
+                return HTTPStatus.BAD_REQUEST, {"error": f"options of the wrong type: {', '.join(mistyped)}"}
+            try:
+                await self.reload(changes)
+            except Exception as error:
+                # The previous state keeps serving
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(error).__name__}: {error}"}
+            return HTTPStatus.OK, {"loaded_at": self.loaded_at}
+        if path not in ENDPOINTS:
+            return HTTPStatus.NOT_FOUND, {"error": f"no endpoint /{path}"}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "html is posted as the request body"}
+        if path == "document-links" and not self.loaded["documents"]:
+            return HTTPStatus.NOT_FOUND, {"error": "no document registry loaded"}
+        if path == "glossary-links" and not self.loaded["glossary"]:
+            return HTTPStatus.NOT_FOUND, {"error": "no glossary loaded"}
+        return await self.batcher.submit(path, body.decode("utf-8"))
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    status, payload = await self.handle(method, target, body)
+                except (ValueError, UnicodeDecodeError) as error:
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": f"{type(error).__name__}: {error}"}
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                content = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(content)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + content
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _start_pool(self, options: dict, method: str):
+        context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            context.set_forkserver_preload(["service"])
+        return context.Pool(self.workers, initializer=init_worker, initargs=(options,))
+
+
+async def serve(service: LinkingService, host: str, port: int) -> None:
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    print(f"serving on http://{host}:{port} with {service.workers} workers")
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local http service for layout and linking with warm state")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--documents", help="json with the document registry")
+    parser.add_argument("--documents-db", help="sqlite registry, built from --documents when missing or stale")
+    parser.add_argument("--glossary", help="json with the glossary")
+    parser.add_argument("--glossary-artifact", help="compiled glossary, rebuilt when the glossary json changes")
+    parser.add_argument("--surface-forms", action="store_true",
+                        help="match glossary terms by precomputed inflected forms instead of lemmatizing every word")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=16, help="most requests sent to a worker at once")
+    parser.add_argument("--batch-delay", type=float, default=2.0,
+                        help="milliseconds a small request waits for others to share its batch")
+    parser.add_argument("--batch-max-chars", type=int, default=1 << 16,
+                        help="larger pages are sent to a worker on their own")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.documents_db and not args.documents and not os.path.exists(args.documents_db):
+        raise SystemExit(missing_registry_message(args.documents_db))
+    options = {
+        "documents_path": args.documents,
+        "glossary_path": args.glossary,
+        "glossary_artifact_path": args.glossary_artifact,
+        "documents_db_path": args.documents_db,
+        "surface_forms": args.surface_forms,
+    }
+
+    async def run() -> None:
+        service = LinkingService(
+            options,
+            workers=args.workers,
+            max_batch=args.batch_size,
+            max_delay=args.batch_delay / 1000,
+            max_batched_size=args.batch_max_chars,
+        )
+        service.start()
+        try:
+            await serve(service, args.host, args.port)
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
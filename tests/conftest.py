@@ -0,0 +1,12 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def write_json(tmp_path):
+    def write(name, data):
+        path = tmp_path / name
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        return str(path)
+    return write
@@ -0,0 +1,70 @@
+import json
+
+from autoglossary import load_glossary
+from autoglossary.artifact import ARTIFACT_VERSION, file_hash
+from autoglossary.tokenizer import Tokenizer
+
+
+GLOSSARY = [
+    {"id": 0, "title": "Кредитная организация"},
+    {"id": 1, "title": "Договор (банковского, расчетного) счета"},
+]
+
+
+def read_artifact(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def test_artifact_is_reused_until_the_glossary_changes(tmp_path, write_json):
+    glossary_path = write_json("glossary.json", GLOSSARY)
+    artifact_path = str(tmp_path / "glossary.artifact")
+    tokenizer = Tokenizer()
+
+    compiled = load_glossary(glossary_path, artifact_path, tokenizer)
+    assert read_artifact(artifact_path)["source_hash"] == file_hash(glossary_path)
+    modified = (tmp_path / "glossary.artifact").stat().st_mtime_ns
+
+    reloaded = load_glossary(glossary_path, artifact_path, tokenizer)
+    assert (tmp_path / "glossary.artifact").stat().st_mtime_ns == modified
+    assert reloaded.dictionary == compiled.dictionary
+
+    write_json("glossary.json", GLOSSARY + [{"id": 2, "title": "Клиент"}])
+    rebuilt = load_glossary(glossary_path, artifact_path, tokenizer)
+    assert read_artifact(artifact_path)["source_hash"] == file_hash(glossary_path)
+    assert rebuilt.dictionary == {**compiled.dictionary, ("клиент",): 2}
+
+
+def test_artifact_of_another_version_is_rebuilt(tmp_path, write_json):
+    glossary_path = write_json("glossary.json", GLOSSARY)
+    artifact_path = str(tmp_path / "glossary.artifact")
+    compiled = load_glossary(glossary_path, artifact_path)
+
+    artifact = read_artifact(artifact_path)
+    artifact["version"] = ARTIFACT_VERSION - 1
+    artifact["nodes"] = []
+    with open(artifact_path, "w", encoding="utf-8") as file:
+        json.dump(artifact, file)
+
+    assert load_glossary(glossary_path, artifact_path).dictionary == compiled.dictionary
+    assert read_artifact(artifact_path)["version"] == ARTIFACT_VERSION
+
+
+def test_surface_forms_are_stored_once_a_run_asks_for_them(tmp_path, write_json):
+    glossary_path = write_json("glossary.json", GLOSSARY)
+    artifact_path = str(tmp_path / "glossary.artifact")
+    tokenizer = Tokenizer()
+
+    compiled = load_glossary(glossary_path, artifact_path, tokenizer)
+    assert compiled.surface_index is None
+    assert "surface_forms" not in read_artifact(artifact_path)
+
+    compiled = load_glossary(glossary_path, artifact_path, tokenizer, surface_forms=True)
+    artifact = read_artifact(artifact_path)
+    assert artifact["surface_forms"] == compiled.surface_index.forms
+    assert artifact["surface_forms"]["кредитной"] == "кредитный"
+
+    # Later runs load the stored forms, with or without asking for them
+    reloaded = load_glossary(glossary_path, artifact_path, tokenizer)
+    assert reloaded.surface_index.forms == compiled.surface_index.forms
+    assert reloaded.surface_index.stems == compiled.surface_index.stems
@@ -0,0 +1,68 @@
+import random
+import re
+
+import pytest
+
+from document_layout.extractors import BaseExtractor
+
+
+def chained_clean_html(text: str) -> str:
+    # The substitutions _clean_html ran one after another before the single scan
+    cleaned = re.sub('&#160;', ' ', text)
+    cleaned = re.sub(r'<(p|table|tr|div|h1|h2|h3|h4).*?>', r'<\1>', cleaned)
+    cleaned = re.sub(r'<font.*?>', '', cleaned)
+    cleaned = re.sub(r'</font>', '', cleaned)
+    cleaned = re.sub(r'<img.*?/?>', '', cleaned)
+    cleaned = re.sub(r'</img>', '', cleaned)
+    cleaned = re.sub(r'<sup>|</sup>|<sub>|</sub>', '', cleaned)
+    cleaned = re.sub(r'<b>|</b>', '', cleaned)
+    cleaned = re.sub(r'<a.*?>', '', cleaned)
+    cleaned = re.sub(r'</a>', '', cleaned)
+    cleaned = re.sub(r'<span.*?>', '', cleaned)
+    cleaned = re.sub(r'</span>', '', cleaned)
+    cleaned = re.sub(r'<hr/>', '', cleaned)
+    cleaned = re.sub(r'(<u>|</u>)', '', cleaned)
+
+    drop_duplicates = ""
+    start = 0
+    for doubled_obj in re.finditer(r"(<i>(.|\n)+?</i>\s*)+", cleaned):
+        only_text = doubled_obj.group(0).strip()
+        only_text = re.sub(r'\n|\t', ' ', only_text)
+        only_text = re.sub(r'(\s)+', r'\1', only_text)
+        only_text = re.sub(r"<i>|</i>", "", only_text)
+        span_start, span_end = doubled_obj.span()
+        drop_duplicates += cleaned[start:span_start] + "<i>" + only_text + "</i>"
+        start = span_end
+    return drop_duplicates + cleaned[start:]
+
+
+FRAGMENTS = [
+    "<", ">", "/", "a", "b", "p", "i", " ", "\n", "\t", "&#160;", "текст", '"', " title=\"",
+    "<p>", "<p class=x>", "</p>", "<pre>", "<table border=1>", "<tr>", "<div id=d>", "<h2>",
+    "<font size=2>", "</font>", "<img src=x/>", "</img>", "<sup>", "</sup>", "<sub>", "</sub>",
+    "<b>", "</b>", "<br/>", "<a href=x>", "</a>", "<abbr>", "<span class=s>", "</span>",
+    "<hr/>", "<u>", "</u>", "<i>", "</i>", "<a\t", "<a title=\"<b>\">",
+]
+
+
+def random_html(rnd: random.Random) -> str:
+    return "".join(rnd.choice(FRAGMENTS) for _ in range(rnd.randint(1, 40)))
+
+
+@pytest.mark.parametrize("text", [
+    '<a title="<b>">ссылка</a>',
+    "<a\t</font>текст",
+    "<<b>a href=x>текст",
+    "<p class=x><font size=2>текст</font></p>",
+    "</<font>font>текст",
+    "<i>один</i>\n<i>два</i> три",
+])
+def test_clean_html_matches_chained_substitutions(text):
+    assert BaseExtractor._clean_html(text) == chained_clean_html(text)
+
+
+def test_clean_html_matches_chained_substitutions_on_random_markup():
+    rnd = random.Random(0)
+    for _ in range(20000):
+        text = random_html(rnd)
+        assert BaseExtractor._clean_html(text) == chained_clean_html(text), text
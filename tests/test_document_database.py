@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from batch_process import build_state
+from benchmarks.corpus import generate_number, generate_registry
+from document_linker import DocumentDatabase, SqliteDocumentDatabase
+
+
+def random_references(rnd, registry, size):
+    references = []
+    for _ in range(size):
+        document = rnd.choice(registry)
+        number = document["number"]
+        if rnd.random() < 0.3:
+            number = number.lower()
+        elif rnd.random() < 0.2:
+            number = generate_number(rnd)
+        date = rnd.choice([document.get("date"), "2000-01-01", None])
+        references.append((number, date))
+    return references
+
+
+def test_get_ids_matches_dict_registry(tmp_path):
+    rnd = random.Random(0)
+    registry = generate_registry(size=2000)
+    for document in rnd.sample(registry, 300):
+        document["id"] = None
+    # Documents sharing a number, the later one wins
+    registry += [dict(document, id=len(registry) + i) for i, document in enumerate(rnd.sample(registry, 100))]
+    registry.append({"id": 99999, "date": "2000-01-01"})
+
+    database = DocumentDatabase(registry)
+    sqlite_database = SqliteDocumentDatabase.build(registry, str(tmp_path / "registry.sqlite"))
+    references = random_references(rnd, registry[:-1], 3000)
+    assert len(set(references)) > 3 * SqliteDocumentDatabase.batch_size
+
+    doc_ids = sqlite_database.get_ids(references)
+    assert doc_ids == database.get_ids(references)
+    assert None in doc_ids.values()
+    for number, date in references[:200]:
+        assert sqlite_database.get_id(number, date) == database.get_id(number, date)
+
+
+def test_null_dated_id_falls_back_to_the_number(tmp_path):
+    registry = [
+        {"id": None, "number": "1-П", "date": "2020-01-01"},
+        {"id": 3, "number": "1-п"},
+        {"id": None, "number": "2-У"},
+    ]
+    references = [("1-П", "2020-01-01"), ("1-п", "2020-01-01"), ("1-П", None), ("2-У", None), ("3-Т", None)]
+    sqlite_database = SqliteDocumentDatabase.build(registry, str(tmp_path / "registry.sqlite"))
+    expected = {
+        ("1-П", "2020-01-01"): 3, ("1-п", "2020-01-01"): 3, ("1-П", None): 3, ("2-У", None): None, ("3-Т", None): None,
+    }
+    assert DocumentDatabase(registry).get_ids(references) == expected
+    assert sqlite_database.get_ids(references) == expected
+
+
+def test_registry_is_rebuilt_when_the_json_changes(tmp_path, write_json):
+    documents_path = write_json("registry.json", [{"id": 1, "number": "1-П"}])
+    db_path = str(tmp_path / "registry.sqlite")
+
+    state = build_state(documents_path, None, documents_db_path=db_path)
+    assert state.document_database.get_id("1-П", None) == 1
+    modified = (tmp_path / "registry.sqlite").stat().st_mtime_ns
+
+    build_state(documents_path, None, documents_db_path=db_path)
+    assert (tmp_path / "registry.sqlite").stat().st_mtime_ns == modified
+
+    write_json("registry.json", [{"id": 2, "number": "1-П"}])
+    state = build_state(documents_path, None, documents_db_path=db_path)
+    assert state.document_database.get_id("1-П", None) == 2
+
+    # Without the json the file is used as it is
+    state = build_state(None, None, documents_db_path=db_path)
+    assert state.document_database.get_id("1-П", None) == 2
+
+
+def test_registry_built_without_a_hash_is_rebuilt(tmp_path, write_json):
+    documents_path = write_json("registry.json", [{"id": 1, "number": "1-П"}])
+    db_path = str(tmp_path / "registry.sqlite")
+    assert SqliteDocumentDatabase.build([{"id": 7, "number": "1-П"}], db_path).source_hash is None
+
+    state = build_state(documents_path, None, documents_db_path=db_path)
+    assert state.document_database.get_id("1-П", None) == 1
+    assert state.document_database.source_hash is not None
+
+
+def test_missing_registry_without_json(tmp_path):
+    with pytest.raises(ValueError, match="pass --documents"):
+        build_state(None, None, documents_db_path=str(tmp_path / "registry.sqlite"))
@@ -0,0 +1,64 @@
+import time
+
+from autoglossary import Glossary, GlossaryLinkInserter
+from autoglossary.tokenizer import Tokenizer
+from result_cache import ResultCache
+
+
+def stored(cache):
+    return dict(cache.connection.execute("SELECT key, size FROM entries"))
+
+
+def put_in_turn(cache, items):
+    # Entries stamped at the same time would leave the eviction order to SQLite
+    for key, value in items.items():
+        cache.put_many({key: value})
+        time.sleep(0.01)
+
+
+def test_total_follows_puts_replacements_and_clear(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many({"a": "x" * 10, "b": "ё" * 10})
+    assert cache.size() == 30 == sum(stored(cache).values())
+
+    cache.put_many({"a": "x" * 4, "c": "x"})
+    assert cache.size() == 25 == sum(stored(cache).values())
+
+    # The total is kept in the file, not in the object
+    assert ResultCache(cache.path).size() == 25
+
+    cache.clear()
+    assert cache.size() == 0
+    assert stored(cache) == {}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"), max_size=50)
+    put_in_turn(cache, {key: "x" * 10 for key in "abcd"})
+    assert cache.get_many(["a", "missing"]) == {"a": "x" * 10}
+    time.sleep(0.01)
+
+    put_in_turn(cache, {"e": "x" * 10})
+    assert sorted(stored(cache)) == ["a", "b", "c", "d", "e"]
+
+    # 10 over the limit plus a tenth of it: the two oldest unread entries go
+    put_in_turn(cache, {"f": "x" * 10})
+    assert sorted(stored(cache)) == ["a", "d", "e", "f"]
+    assert cache.size() == 40
+
+
+def test_glossary_entries_are_kept_apart_by_matching_mode(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    tokenizer = Tokenizer()
+    glossary = Glossary([{"id": 1, "title": "Кредитная организация"}], tokenizer)
+    html = "<p>кредитной <b>организации</b></p>"
+
+    aware = cache.glossary_insertion(GlossaryLinkInserter(tokenizer), html, glossary.matcher, "glossary")
+    plain = cache.glossary_insertion(
+        GlossaryLinkInserter(tokenizer, markup_aware=False), html, glossary.matcher, "glossary",
+    )
+    assert aware == GlossaryLinkInserter(tokenizer).html_insertion(html=html, glossary=glossary.matcher)
+    assert plain == GlossaryLinkInserter(tokenizer, markup_aware=False).html_insertion(
+        html=html, glossary=glossary.matcher,
+    )
+    assert len(stored(cache)) == 2
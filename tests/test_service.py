@@ -0,0 +1,91 @@
+import asyncio
+import gc
+import json
+from http import HTTPStatus
+
+import pytest
+
+import batch_process
+from service import LinkingService
+
+
+HTML = "<p>Кредитной организации от 01.02.2020 № 1-П</p>"
+
+
+@pytest.fixture
+def options(write_json):
+    return {
+        "documents_path": write_json("registry.json", [{"id": 7, "number": "1-П", "date": "2020-02-01"}]),
+        "glossary_path": write_json("glossary.json", [{"id": 3, "title": "Кредитная организация"}]),
+        "glossary_artifact_path": None,
+        "documents_db_path": None,
+        "surface_forms": False,
+    }
+
+
+@pytest.fixture
+def service(options):
+    service = LinkingService(options, workers=1)
+    yield service
+    service.close()
+    batch_process._state = None
+    gc.unfreeze()
+
+
+def request(service, method, path, body=b""):
+    return asyncio.run(service.handle(method, path, body))
+
+
+@pytest.mark.parametrize("body, error", [
+    (b"[1]", "reload body must be a JSON object"),
+    (b'"documents_path"', "reload body must be a JSON object"),
+    (b'{"glossary": "glossary.json"}', "unknown options: glossary"),
+    (b'{"surface_forms": 1, "glossary_path": 2}', "options of the wrong type: glossary_path, surface_forms"),
+    (b'{"documents_path": ["registry.json"]}', "options of the wrong type: documents_path"),
+])
+def test_malformed_reload_is_rejected(service, body, error):
+    assert request(service, "POST", "/reload", body) == (HTTPStatus.BAD_REQUEST, {"error": error})
+    assert service.pool is None
+
+
+def test_unknown_paths_and_methods(service):
+    assert request(service, "POST", "/links")[0] == HTTPStatus.NOT_FOUND
+    assert request(service, "GET", "/layout")[0] == HTTPStatus.METHOD_NOT_ALLOWED
+    with pytest.raises(ValueError):
+        request(service, "POST", "/reload", b"{")
+
+
+def test_reload_swaps_the_workers_and_keeps_them_on_failure(service, tmp_path):
+    service.start()
+
+    async def scenario():
+        status, linked = await service.handle("POST", "/glossary-links", HTML.encode("utf-8"))
+        assert status == HTTPStatus.OK
+        assert 'data-glossary-item-id="3"' in linked["html"]
+        status, documents = await service.handle("POST", "/document-links", HTML.encode("utf-8"))
+        assert status == HTTPStatus.OK
+        assert 'href="/library/e-library/document/7"' in documents["html"]
+        _, health = await service.handle("GET", "/health", b"")
+        assert health["documents"] and health["glossary"]
+
+        missing = json.dumps({"glossary_path": str(tmp_path / "missing.json")}).encode("utf-8")
+        status, failed = await service.handle("POST", "/reload", missing)
+        assert status == HTTPStatus.INTERNAL_SERVER_ERROR
+        assert "FileNotFoundError" in failed["error"]
+        assert await service.handle("POST", "/glossary-links", HTML.encode("utf-8")) == (HTTPStatus.OK, linked)
+        assert await service.handle("GET", "/health", b"") == (HTTPStatus.OK, health)
+
+        status, reloaded = await service.handle("POST", "/reload", b'{"glossary_path": null}')
+        assert status == HTTPStatus.OK
+        assert reloaded["loaded_at"] > health["loaded_at"]
+        assert batch_process._state is None
+        _, health = await service.handle("GET", "/health", b"")
+        assert health["documents"] and not health["glossary"]
+        assert await service.handle("POST", "/glossary-links", HTML.encode("utf-8")) == (
+            HTTPStatus.NOT_FOUND, {"error": "no glossary loaded"},
+        )
+        # The new workers built the registry themselves
+        assert await service.handle("POST", "/document-links", HTML.encode("utf-8")) == (HTTPStatus.OK, documents)
+
+    asyncio.run(scenario())
+    assert service.options["glossary_path"] is None
@@ -0,0 +1,55 @@
+import pytest
+
+from autoglossary import Glossary, GlossaryLinkInserter, SurfaceIndex
+from autoglossary.tokenizer import Tokenizer
+from benchmarks.corpus import generate_glossary, generate_html
+
+
+INFLECTED_HTML = (
+    "<p>Кредитной организации, кредитных организаций и КРЕДИТНЫМИ ОРГАНИЗАЦИЯМИ; "
+    "о договорах банковского счёта, договором расчетного счета.</p>"
+    "<p>Клиентам банка, клиенту <b>банка</b>, кассовые операции, <i>кассовыми</i> операциями</p>"
+    "<p>Кредитнейшая организация, ссудную гарантию займа, платежные карты вкладов</p>"
+)
+
+HAND_GLOSSARY = [
+    {"id": 10000, "title": "Кредитная организация"},
+    {"id": 10001, "title": "Договор (банковского, расчетного) счета"},
+    {"id": 10002, "title": "Клиент банка"},
+    {"id": 10003, "title": "Кассовая операция"},
+]
+
+
+@pytest.fixture(scope="module")
+def glossary():
+    return Glossary(generate_glossary(size=300) + HAND_GLOSSARY, Tokenizer())
+
+
+@pytest.mark.parametrize("html", [
+    INFLECTED_HTML,
+    generate_html(paragraphs=200, terms=3, glossary=generate_glossary(size=300)),
+], ids=["inflected", "generated"])
+def test_surface_forms_find_the_terms_full_lemmatization_finds(glossary, html):
+    tokenizer = glossary.tokenizer
+    surface_index = SurfaceIndex.from_matcher(glossary.matcher, tokenizer)
+
+    tokens = GlossaryLinkInserter(tokenizer)._tokenize(html)
+    full = glossary.matcher.find(tokenizer.lemmatize(tokens))
+    assert full
+    assert glossary.matcher.find(surface_index.lemmatize(tokens, tokenizer)) == full
+
+    for markup_aware in (True, False):
+        expected = GlossaryLinkInserter(tokenizer, markup_aware=markup_aware).html_insertion(
+            html=html, glossary=glossary.matcher,
+        )
+        linked = GlossaryLinkInserter(tokenizer, surface_index, markup_aware).html_insertion(
+            html=html, glossary=glossary.matcher,
+        )
+        assert linked == expected
+
+
+def test_surface_index_survives_the_artifact_round_trip(glossary):
+    surface_index = SurfaceIndex.from_matcher(glossary.matcher, glossary.tokenizer)
+    restored = SurfaceIndex(surface_index.forms, sorted(surface_index.stems))
+    tokens = GlossaryLinkInserter(glossary.tokenizer)._tokenize(INFLECTED_HTML)
+    assert restored.lemmatize(tokens, glossary.tokenizer) == surface_index.lemmatize(tokens, glossary.tokenizer)